@@ -49,6 +49,8 @@ from load_history import load_history
 from utilities import check_internet,Memory_Monitor
 from watchdog import *
 from scoring import Select_Scoring
+from bm_log import setup_logging,stop_logging
+from spot_subs import Subscriptions
 
 #########################################################################################
 
@@ -67,6 +69,7 @@ if __name__ == "__main__":
     P=PARAMS()
     print("P=")
     pprint(vars(P))
+    setup_logging(P)
     print('\n\tPython version=',sys.version_info[0],'.',
           sys.version_info[1],'.',sys.version_info[2],'\n')
 
@@ -74,8 +77,10 @@ if __name__ == "__main__":
     if True:
         if P.SERVER=="WSJT":
             P.MEM = Memory_Monitor('/tmp/BANDMAP_MEMORY_WSJT.TXT')
+            P.LATENCY_LOG = '/tmp/BANDMAP_LATENCY_WSJT.TXT'
         else:
             P.MEM = Memory_Monitor('/tmp/BANDMAP_MEMORY.TXT')
+            P.LATENCY_LOG = '/tmp/BANDMAP_LATENCY.TXT'
     
     # Open connection to rig
     P.sock = open_rig_connection(P.CONNECTION,0,P.PORT,0,'BANDMAP',rig=P.RIG)
@@ -100,6 +105,10 @@ if __name__ == "__main__":
     P.bm_gui.read_aux_data()
     P.SCORING=Select_Scoring(P)
 
+    # Read the log before any spots come in so they're colored correctly
+    P.bm_gui.status_bar.setText('Reading log ...')
+    P.bm_gui.read_log()
+
     # Start thread with UDP server
     if P.BM_UDP_CLIENT:
         P.bm_gui.status_bar.setText('Opening UDP client ...')
@@ -111,6 +120,10 @@ if __name__ == "__main__":
         worker.start()
         P.threads.append(worker)
 
+        # Apps can subscribe to a band & hear about changes as they happen
+        P.subs = Subscriptions(P)
+        P.SpotList.set_listener(P.subs.notify)
+
     # Start thread to manage feed from dx cluster
     P.bm_gui.status_bar.setText('Starting Cluster Feed Monitor ...')
     P.ClusterFeed = ClusterFeed(P,200)
@@ -130,6 +143,7 @@ if __name__ == "__main__":
         pprint(vars(P))
         print(' ')
     P.bm_gui.root.mainloop()
+    stop_logging()
 
 
 
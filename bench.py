@@ -0,0 +1,296 @@
+#!/usr/bin/env -S uv run --script
+#
+# NEW: /home/joea/miniconda3/envs/aa2il/bin/python -u
+# OLD: /usr/bin/python3 -u
+#########################################################################################
+#
+# bench.py - Rev. 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Benchmark the spot pipeline w/o the gui or a rig.  Made up cluster & RBN
+# spots are pushed thru the same code that digests spots from the cluster
+# & the time spent in each step is measured.  Results are saved as json so
+# we can see if things got better or worse from one revision to the next.
+#
+# Usage:
+#     bench.py                                  Defaults
+#     bench.py -qsos 1000 10000 50000           Run for several log sizes
+#     bench.py -lines 50000 -calls 5000 -rbn .8 -out after.json
+#
+# All of the usual bandmap flags (-contest, -dx_only, -modes, etc.) can be used.
+#
+#########################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#########################################################################################
+
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import subprocess
+from datetime import datetime,timedelta
+from params import PARAMS
+from replay import headless_setup,percentiles
+from spot_store import SpotStore,BandViews
+from dupe_index import DupeIndex
+from cluster_feed import band2int
+from utilities import error_trap
+from bm_log import setup_logging,stop_logging
+
+#########################################################################################
+
+BANDS    = [160,80,40,30,20,17,15,12,10]
+CW_SEGS  = {160:(1800,1840), 80:(3500,3570), 40:(7000,7060), 30:(10100,10130),
+            20:(14000,14070), 17:(18068,18095), 15:(21000,21070), 12:(24890,24915),
+            10:(28000,28070)}
+SSB_SEGS = {160:(1840,2000), 80:(3600,4000), 40:(7125,7300), 30:(10130,10150),
+            20:(14150,14350), 17:(18110,18168), 15:(21200,21450), 12:(24930,24990),
+            10:(28300,28800)}
+FT8_FREQS = {160:1840, 80:3573, 40:7074, 30:10136, 20:14074, 17:18100, 15:21074,
+             12:24915, 10:28074}
+
+# A mix of U.S. & DX prefixes
+PREFIXES = ['K','W','N','AA','AB','KA','KB','KD','WA','WB','VE','VA','JA','JH','DL','DJ',
+            'G','M','F','I','EA','OH','SM','LA','OZ','UA','RA','PY','LU','CE','VK','ZL',
+            'ZS','HA','OK','OM','SP','YO','LZ','9A','S5','4X','5B','EI','ON','PA','HB9',
+            'OE','YU','CT','EA8','KH6','KL7','XE','CO','HK','YV','BY','HL','DU','VU']
+
+#########################################################################################
+
+# Function to make up a call
+def make_call(rnd):
+    suffix = ''.join( rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+                      for i in range(rnd.choice([1,2,2,3,3,3])) )
+    return rnd.choice(PREFIXES) + str(rnd.randint(0,9)) + suffix
+
+# Function to make up a population of stations to be spotted
+def make_calls(ncalls,rnd):
+    calls=set()
+    while len(calls)<ncalls:
+        calls.add( make_call(rnd) )
+    return sorted(calls)
+
+# Function to make up a cluster or RBN spot line, e.g.
+#    DX de W3LPL:     14025.0  JA1ABC       CW 599                       1234Z
+#    DX de K1TTT-#:   14025.0  JA1ABC       CW 22 dB 25 WPM CQ           1234Z
+def make_line(call,t,rnd,RBN):
+    band = rnd.choice(BANDS)
+    if RBN:
+        spotter = rnd.choice(['K1TTT','W3LPL','KM3T','VE2WU','DK9IP','OH6BG','WZ7I'])+'-#:'
+        if rnd.random()<.2:
+            freq = FT8_FREQS[band] + .001*rnd.randint(300,2700)
+            comment = 'FT8 %d dB' % rnd.randint(-24,10)
+        else:
+            lo,hi = CW_SEGS[band]
+            freq = rnd.uniform(lo,hi)
+            comment = 'CW %d dB %d WPM CQ' % (rnd.randint(3,40),rnd.randint(18,35))
+    else:
+        spotter = make_call(rnd)+':'
+        if rnd.random()<.5:
+            lo,hi = CW_SEGS[band]
+            comment = 'CW '+rnd.choice(['','599','TNX QSO','CQ TEST'])
+        else:
+            lo,hi = SSB_SEGS[band]
+            comment = rnd.choice(['','59','TNX QSO','CQ CONTEST','USB'])
+        freq = rnd.uniform(lo,hi)
+    return 'DX de %-9s %8.1f  %-12s %-30s %4sZ\n' % \
+        (spotter,freq,call,comment,t.strftime('%H%M'))
+
+# Function to generate spot lines at a given rate (lines/sec), ending now.
+# A fraction of the lines come from the RBN, the rest from the cluster.
+def make_lines(nlines,calls,rate,rbn,rnd):
+    now = datetime.utcnow()
+    t0  = now - timedelta(seconds=nlines/rate)
+    lines=[]
+    for i in range(nlines):
+        t = t0 + timedelta(seconds=i/rate)
+        lines.append( make_line(rnd.choice(calls),t,rnd,rnd.random()<rbn) )
+    return lines
+
+# Function to make up a log.  About half the spotted stations have been worked
+# on some band, the rest of the log is filled out with other stations.
+def make_log(nqsos,calls,rnd):
+    now = datetime.utcnow()
+    qsos=[]
+    for i in range(nqsos):
+        if i%2==0:
+            call = rnd.choice(calls)
+        else:
+            call = make_call(rnd)
+        t = now - timedelta(hours=rnd.uniform(0,72))
+        qsos.append({'call'         : call,
+                     'band'         : str(rnd.choice(BANDS))+'m',
+                     'mode'         : rnd.choice(['CW','CW','SSB','FT8']),
+                     'qso_date_off' : t.strftime('%Y%m%d'),
+                     'time_off'     : t.strftime('%H%M%S')})
+    return qsos
+
+#########################################################################################
+
+# Function to summarize the times for one stage
+def summary(vals):
+    n     = len(vals)
+    total = sum(vals)
+    p50,p99,pmax = percentiles(vals)
+    return {'count'   : n,
+            'total'   : total,
+            'per_sec' : n/total if total>0 else 0,
+            'p50_ms'  : p50,
+            'p99_ms'  : p99,
+            'max_ms'  : pmax}
+
+# Function to start again with an empty spot list & a new log
+def reset(P,band,qsos):
+    P.nspots=0
+    P.SpotList=SpotStore()
+    P.views=BandViews()
+    P.current=P.views.view( band2int(band) )
+    P.qsos=list(qsos)
+    P.dupes=DupeIndex()
+    P.dupes.add_list(qsos)
+
+# Function to run the benchmark for one log size
+def run(P,feed,lines,qsos,band,CULL_EVERY=1000):
+
+    reset(P,band,qsos)
+    stages={'digest':[], 'b4':[], 'collect':[], 'cull':[]}
+
+    # Digest all the spots, culling every so often the way the gui does
+    for i,line in enumerate(lines):
+        t=time.perf_counter()
+        try:
+            feed.process_line(line)
+        except:
+            error_trap('BENCH: Problem digesting line ???')
+        stages['digest'].append(time.perf_counter()-t)
+        while not P.bm_q.empty():
+            P.bm_q.get_nowait()
+            P.bm_q.task_done()
+
+        if (i+1)%CULL_EVERY==0:
+            t=time.perf_counter()
+            P.bm_gui.cull_old_spots()
+            stages['cull'].append(time.perf_counter()-t)
+    nspots=len(P.SpotList)
+
+    # Check each spot against the log
+    for x in list(P.SpotList):
+        b=str(x.band)+'m'
+        t=time.perf_counter()
+        feed.B4(x,b)
+        stages['b4'].append(time.perf_counter()-t)
+
+    # Gather the spots for each band, as when the band is changed
+    for b in BANDS:
+        t=time.perf_counter()
+        P.bm_gui.collect_spots(str(b)+'m')
+        stages['collect'].append(time.perf_counter()-t)
+
+    # One last cull
+    t=time.perf_counter()
+    P.bm_gui.cull_old_spots()
+    stages['cull'].append(time.perf_counter()-t)
+
+    return {'qsos'   : len(qsos),
+            'lines'  : len(lines),
+            'spots'  : P.nspots,
+            'kept'   : nspots,
+            'stages' : dict([(name,summary(vals)) for name,vals in stages.items()])}
+
+# Function to figure out which revision we're benchmarking
+def revision():
+    try:
+        return subprocess.check_output(['git','describe','--always','--dirty'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except:
+        return None
+
+# Function to print results of a run
+def report(res):
+    print('\nBENCH: %d qsos, %d lines, %d spots digested, %d in list' % \
+          (res['qsos'],res['lines'],res['spots'],res['kept']))
+    print('       %-8s %8s %10s %10s %10s %10s' % \
+          ('Stage','Count','per sec','p50 (ms)','p99 (ms)','max (ms)'))
+    for name,s in res['stages'].items():
+        print('       %-8s %8d %10.1f %10.3f %10.3f %10.3f' % \
+              (name,s['count'],s['per_sec'],s['p50_ms'],s['p99_ms'],s['max_ms']))
+
+#########################################################################################
+
+# Begin executable
+if __name__ == "__main__":
+
+    # Our own flags - everything else goes to PARAMS
+    arg_proc = argparse.ArgumentParser(add_help=False)
+    arg_proc.add_argument("-lines", help="No. of spot lines",
+                          type=int,default=20000)
+    arg_proc.add_argument("-calls", help="No. of different stations spotted",
+                          type=int,default=3000)
+    arg_proc.add_argument("-rate", help="Spot lines per sec",
+                          type=float,default=20.)
+    arg_proc.add_argument("-rbn", help="Fraction of lines from the RBN",
+                          type=float,default=.7)
+    arg_proc.add_argument("-qsos", help="Log size(s)",
+                          type=int,nargs='+',default=[1000])
+    arg_proc.add_argument("-seed", help="Random seed",
+                          type=int,default=1)
+    arg_proc.add_argument("-band", help="Band shown in gui",
+                          type=str,default='20m')
+    arg_proc.add_argument("-out", help="Where to save results",
+                          type=str,default='bench.json')
+    arg_proc.add_argument('-verbose', action='store_true',help='Show all the usual output')
+    args,rest = arg_proc.parse_known_args()
+    sys.argv = sys.argv[:1] + rest
+
+    P=PARAMS()
+    setup_logging(P)
+    P.CLUSTER=P.SERVER='NONE'
+    feed = headless_setup(P,args.band,LOG=False)
+
+    # Same spots for every log size so the runs can be compared
+    rnd   = random.Random(args.seed)
+    calls = make_calls(args.calls,rnd)
+    lines = make_lines(args.lines,calls,args.rate,args.rbn,rnd)
+    print('\nBENCH: %d lines, %d calls, %.1f lines/sec, %d%% RBN' % \
+          (len(lines),len(calls),args.rate,100*args.rbn))
+
+    results=[]
+    for nqsos in args.qsos:
+        qsos = make_log(nqsos,calls,random.Random(args.seed+nqsos))
+        if not args.verbose:
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull,'w')
+        try:
+            res = run(P,feed,lines,qsos,args.band)
+        finally:
+            if not args.verbose:
+                sys.stdout.close()
+                sys.stdout = stdout
+        report(res)
+        results.append(res)
+
+    # Save results
+    stop_logging()
+    out = {'revision' : revision(),
+           'date'     : datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+           'python'   : sys.version.split()[0],
+           'settings' : {'lines':args.lines, 'calls':args.calls, 'rate':args.rate,
+                         'rbn':args.rbn, 'seed':args.seed, 'band':args.band,
+                         'contest':P.CONTEST_NAME, 'modes':P.SHOW_MODES},
+           'runs'     : results}
+    with open(args.out,'w') as fp:
+        json.dump(out,fp,indent=1)
+    print('\nBENCH: Results saved to',args.out)
@@ -25,6 +25,7 @@ import time
 import socket
 import json
 import platform
+import queue
 
 from datetime import datetime
 from dx.spot_processing import ChallengeData
@@ -47,14 +48,26 @@ from widgets_tk import StatusBar
 from tcp_server import open_udp_client,KEYER_UDP_PORT
 from bm_udp import *
 from load_history import load_history
+from spot_store import SpotStore,SortedSpots,BandViews
+from spot_filter import SpotFilter
+from dupe_index import DupeIndex
+from spot_queue import coalesce,DELETE
+from latency import LATENCY,stamp
+from bm_log import get_log,set_log_levels
 
 #########################################################################################
 
 DEFAULT_BAND = '20m'
 VERBOSITY=0
+MAX_ROW_UPDATES=25              # Re-draw entire list box if there are more changes than this
+RIG_POLL_MSEC=1000              # How often to query the rig for freq, mode, etc.
+CULL_MSEC=1000                  # How often to look for old spots
 
 #########################################################################################
 
+# Logger for the busy parts of the gui
+GUI_LOG = get_log('gui')
+
 # Setup basic logging
 logging.basicConfig(
     format="%(asctime)-15s [%(levelname)s] %(funcName)s:\t(message)s",
@@ -69,13 +82,17 @@ class BandMapGUI:
         # Init
         self.P = P
         P.nspots=0
-        P.SpotList=[]
-        P.current=[]
+        P.SpotList=SpotStore()
+        P.views=BandViews()
+        P.current=P.views.view(None)
+        P.filter=SpotFilter(P)
         P.friends=[]
         P.most_wanted=[]
         P.corrections=[]
         P.members=[]
         P.qsos=[]
+        P.dupes=DupeIndex()
+        P.subs=None
         P.last_check=datetime.now()
 
         if P.FT4:
@@ -87,6 +104,12 @@ class BandMapGUI:
         self.old_mode = None
         self.rig_band=None
 
+        # The spots currently shown in the list box, in the same order
+        self.shown = SortedSpots()
+
+        # Keep track of how long it takes to re-populate the list box (ms)
+        self.render_stats = {'n':0, 'last':0., 'max':0., 'total':0.}
+
         # UDP stuff
         P.bm_udp_client=None
         P.bm_udp_ntries=0
@@ -311,8 +334,26 @@ class BandMapGUI:
         
         print('Initial server=',self.P.SERVER)
         self.node.set(self.P.SERVER)
+
+        # Have the cluster feed let us know as soon as there are new spots
+        self.root.bind('<<NewSpots>>', self.NewSpots)
+        self.P.bm_q.set_waker(self.wake)
         
         self.WatchDog()
+        self.root.after(CULL_MSEC, self.CullTimer)
+
+    # Called from the feed thread when there is something in the spot queue.
+    # The virtual event is queued by Tk so the work gets done in the gui thread.
+    # The feed never holds its lock when it calls this (see spot_queue.py).
+    def wake(self):
+        self.root.event_generate('<<NewSpots>>', when='tail')
+
+    # Callback to handle new spots
+    def NewSpots(self,event=None):
+        self.P.bm_q.drained()
+        self.P.ClusterFeed.gui_calls()
+        if self.apply_updates():
+            self.LBsanity()
 
 
     # Callback to handle mouse wheel scrolling since Tk doesn't seem to do a very good job of it
@@ -488,58 +529,18 @@ class BandMapGUI:
 
         P=self.P
 
-        print('COLLECT_SPOTS: nspots=',len(P.SpotList),'\tband=',band,
-              '\nReverse=',REVERSE,'\tOVERRIDE=',OVERRIDE,'\tCONTEST_MODE=', self.P.CONTEST_MODE)
+        GUI_LOG.info('COLLECT_SPOTS: nspots= %d \tband= %s \nReverse= %s \tOVERRIDE= %s \tCONTEST_MODE= %s',
+                     len(P.SpotList),band,REVERSE,OVERRIDE,self.P.CONTEST_MODE)
 
-        if band=='MW':
-            iband=160
-        elif 'cm' in band:
-            iband=int( band.replace('cm','') )
+        # Apply the same filters as the feed, except maybe for dupes
+        if OVERRIDE:
+            spot_filter = SpotFilter(P,show_dupes=True)
         else:
-            iband=int( band.replace('m','') )
-
-        spots=[]
-        for x in P.SpotList:
-            keep= x and x.band == iband
-            if self.P.DX_ONLY:
-                # Retain only stations outside US or SESs
-                keep = keep and (x.dx_station.country!='United States' or len(x.dx_call)==3 or \
-                                 x.dx_call=='WM3PEN') 
-            if self.P.NA_ONLY:
-                # Retain only stations in North America
-                keep = keep and x.dx_station.continent=='NA'
-
-            if self.P.NEW_CWOPS_ONLY:
-                # Retain only cwops stations not worked yet this year
-                keep = keep and self.P.ClusterFeed.cwops_worked_status(x.dx_call)==1
-
-            # Retain only modes we are interested in
-            xm = x.mode
-            if xm in ['FT8','FT4','DIGITAL','JT65']:
-                xm='DIGI'
-            elif xm in ['SSB','LSB','USB','FM']:
-                xm='PH'
-            #if keep and (xm not in self.P.SHOW_MODES):
-            #    print('COLLECT_SPOTS: Culling',xm,'spot - ', self.P.SHOW_MODES)
-            keep = keep and (xm in self.P.SHOW_MODES)
-
-            # Check for dupes
-            if keep:
-                match = self.P.ClusterFeed.B4(x,band)
-                c,c2,age=self.P.ClusterFeed.spot_color(match,x)
-                x.color=c
-                if not (self.P.SHOW_DUPES or OVERRIDE):
-                    keep = keep and (c2!='r')
-                #print('COLLECT SPOTS:',x.dx_call,c,c2,keep,band,match)
-                #print('\tx.color=',x.color)
-
-            # Keep spots that haven't been culled
-            if keep:
-                spots.append(x)
-            
+            spot_filter = P.filter
+        spots = spot_filter.filter( P.SpotList.band_spots( band2int(band) ) )
         spots.sort(key=lambda x: x.frequency, reverse=REVERSE)
 
-        print('\tNo. Collect spots=',len(spots))
+        GUI_LOG.info('\tNo. Collect spots= %d',len(spots))
         return spots
 
 
@@ -610,41 +611,25 @@ class BandMapGUI:
             # Make sure antenna selection is correct also
             self.SelectAnt(-2,band)
             
-        # Extract a list of spots that are in the desired band
-        P.current = self.collect_spots(band)
+        # The feed keeps a sorted list of spots for each band so all we need
+        # to do is pick the one for the desired band
+        if not self.feed_lock('SELECT BANDS'):
+            return
+        try:
+            P.current = P.views.view( band2int(band) )
+        finally:
+            P.ClusterFeed.lock.release()
         y=self.scrolling('SELECT BANDS B')
 
         P.GUI_BAND = self.band.get()
         P.GUI_MODE = self.mode.get()
         
-        # Get latest logbook
-        now = datetime.utcnow().replace(tzinfo=UTC)
-        if (self.P.STAND_ALONE and False) or len(self.P.qsos)==0:
-            if self.P.LOG_NAME0:
-                # Log for operator if different from current callsign
-                # We won't keep reading this file so we set REVISIT=False
-                print('\nGUI: Reading log file',self.P.LOG_NAME0)
-                logbook = parse_adif(self.P.LOG_NAME0,REVISIT=False,verbosity=0)
-                self.P.qsos += logbook
-                print('QSOs in log=',len(logbook),len(self.P.qsos))
-
-            # Log for current callsign
-            # We will keep reading this file for new QSOs so we set REVISIT=True
-            print('\nGUI: Reading log file',self.P.LOG_NAME)
-            logbook = parse_adif(self.P.LOG_NAME,REVISIT=True,verbosity=0)
-            self.P.qsos += logbook
-            print('QSOs in log=',len(logbook),len(self.P.qsos))
-            #sys.exit(0)
+        # Get latest logbook - normally this was done before the feed started
+        self.read_log()
 
         # Look for QSOs from this contest
-        for qso in self.P.qsos:
-            now = datetime.utcnow().replace(tzinfo=UTC)
-            t1 = datetime.strptime(now.strftime("%Y%m%d %H%M%S"), "%Y%m%d %H%M%S") 
-            t2 = datetime.strptime( qso['qso_date_off']+" "+qso["time_off"] , "%Y%m%d %H%M%S")
-            delta=(t1-t2).total_seconds() / 3600
-            match = delta< self.P.MAX_HOURS_DUPE
-            if match:
-                self.P.SCORING.otf_scoring(qso)
+        for rec in self.P.dupes.recent(self.P.MAX_HOURS_DUPE):
+            self.P.SCORING.otf_scoring(rec.raw)
 
         if self.P.CWOPS:
             self.calls = self.calls1 + [ qso['call'] for qso in self.P.qsos ]
@@ -654,29 +639,8 @@ class BandMapGUI:
             #sys.exit(0)
             
         # Re-populate list box with spots from this band
-        # This seems to be the slow part
-        #print 'Repopulate ...',len(P.current),len(self.P.qsos)
-        self.lb.delete(0, END)
-        n=0
-        for x in P.current:
-            #pprint(vars(x))
-            dxcc=x.dx_station.country
-            if self.P.CLUSTER=='WSJT':
-                #print('Insert1')
-                self.lb.insert(END, "%4d  %-10.10s  %+6.6s %-17.17s %+4.4s" % \
-                               (int(x.df),x.dx_call,x.mode,cleanup(dxcc),x.snr))
-            else:
-                #print('Insert2')
-                if x.mode=='CW':
-                    val=x.wpm
-                else:
-                    val=''
-                self.lb.insert(END, "%-6.1f  %-10.19s  %+6.6s %-15.15s %+4.4s" % \
-                               (x.frequency,x.dx_call,x.mode,cleanup(dxcc),val))
-
-            # JBA - Change background colors on each list entry
-            self.lb.itemconfigure(END, background=P.current[n].color)
-            n+=1
+        self.shown = SortedSpots(P.current)
+        self.render_spots(self.shown)
 
         # Reset lb view
         self.LBsanity()
@@ -687,22 +651,108 @@ class BandMapGUI:
                   '\tlen SpotList=',len(P.SpotList),
                   '\tlen Current=',len(P.current))
 
+
+    # Function to read the log.  Spots are colored as they're digested so
+    # this needs to happen before the cluster feed is started (see bandmap.py).
+    def read_log(self):
+        if (self.P.STAND_ALONE and False) or len(self.P.qsos)==0:
+            if self.P.LOG_NAME0:
+                # Log for operator if different from current callsign
+                # We won't keep reading this file so we set REVISIT=False
+                print('\nGUI: Reading log file',self.P.LOG_NAME0)
+                logbook = parse_adif(self.P.LOG_NAME0,REVISIT=False,verbosity=0)
+                self.P.qsos += logbook
+                self.P.dupes.add_list(logbook)
+                print('QSOs in log=',len(logbook),len(self.P.qsos))
+
+            # Log for current callsign
+            # We will keep reading this file for new QSOs so we set REVISIT=True
+            print('\nGUI: Reading log file',self.P.LOG_NAME)
+            logbook = parse_adif(self.P.LOG_NAME,REVISIT=True,verbosity=0)
+            self.P.qsos += logbook
+            self.P.dupes.add_list(logbook)
+            print('QSOs in log=',len(logbook),len(self.P.qsos))
+            #sys.exit(0)
+            
+    # Function to re-build the views for all bands - needed when the filters change
+    # The spots already have everything the filter needs so this is quick.
+    # If the settings affect the colors, the spots are re-colored first.
+    def Refilter(self,recolor=False):
+        P=self.P
+        print('REFILTER: Re-building band views ...')
+        P.filter = SpotFilter(P)
+        if P.subs:
+            P.subs.refilter()
+        if not self.feed_lock('REFILTER'):
+            return
+        try:
+            # Go by the bands in the store, not the existing views - a band with
+            # no view yet may have spots that pass the new filters.  Spots that
+            # aren't in a ham band don't have a band no. (e.g. None) & are
+            # never shown so they're skipped.
+            for iband in list(P.SpotList.by_band.keys()):
+                if isinstance(iband,int):
+                    spots = P.SpotList.band_spots(iband)
+                    if recolor:
+                        self.recolor_spots(spots)
+                    P.views.set_view(iband, P.filter.filter(spots) )
+        finally:
+            P.ClusterFeed.lock.release()
+        self.SelectBands()
+
+    # Function to re-compute the colors for a list of spots
+    def recolor_spots(self,spots):
+        P=self.P
+        for x in spots:
+            match = P.ClusterFeed.B4(x,str(x.band)+'m')
+            c,c2,age = P.ClusterFeed.spot_color(match,x)
+            P.SpotList.recolor(x,c)
             
+    # Function to re-populate the list box with a list of spots.
+    # This used to be the slow part so we do it in bulk - all of the rows are
+    # inserted with a single call and all of the background colors are set with
+    # one Tcl script, grouped by color, rather than two round-trips per row.
+    def render_spots(self,spots):
+        t0=time.perf_counter()
+        WSJT = self.P.CLUSTER=='WSJT'
+
+        rows=[]
+        colors={}
+        for i,x in enumerate(spots):
+            try:
+                rows.append( format_spot(x,WSJT) )
+            except:
+                error_trap('GUI->RENDER SPOTS: Problem formatting spot ???')
+                rows.append( x.dx_call )
+            if x.color:
+                colors.setdefault(x.color,[]).append(str(i))
+
+        self.lb.delete(0, END)
+        if len(rows)>0:
+            self.lb.insert(END, *rows)
+            lb=str(self.lb)
+            script=[]
+            for c,idx in colors.items():
+                script.append('foreach i {%s} {%s itemconfigure $i -background %s}' % \
+                              (' '.join(idx),lb,c))
+            self.lb.tk.eval( '\n'.join(script) )
+
+        # Keep track of how long this takes
+        dt=1000.*(time.perf_counter()-t0)
+        stats=self.render_stats
+        stats['n']     += 1
+        stats['last']   = dt
+        stats['max']    = max(stats['max'],dt)
+        stats['total'] += dt
+        if self.P.DEBUG>0:
+            print('RENDER SPOTS: nrows=',len(rows),'\tncolors=',len(colors),
+                  '\tdt=',round(dt,2),'ms\tavg=',round(stats['total']/stats['n'],2),'ms')
+
     # Function to set list box view
     def set_lbview(self,frq,MIDDLE=False):
-        
-        dfbest=1e9
-        ibest=-1
-        idx=0
-
-        # Keep track of entry that is closest to current rig freq
-        for x in P.current:
-            df=abs( x.frequency-frq )
-            #            print idx,x.frequency,frq,df,ibest
-            if df<dfbest:
-                dfbest=df
-                ibest=idx
-            idx=idx+1
+
+        # Find entry that is closest to current rig freq
+        ibest=self.shown.nearest(frq)
 
         # Make sure its visible and highlight it
         if ibest>-1:
@@ -712,7 +762,7 @@ class BandMapGUI:
             yview=self.lb.yview()
             """
             print("LBSANITY: Closest=",ibest,
-                  '\tf=',P.current[ibest].frequency,
+                  '\tf=',self.shown[ibest].frequency,
                   '\tsize=',sz,
                   '\tsb=',sb,
                   '\tyview',yview)
@@ -772,10 +822,20 @@ class BandMapGUI:
     def Clear_Spot_List(self):
         P=self.P
         print("\n------------- Clear Spot List -------------",self.P.CLUSTER,'\n')
-        P.nspots=0
-        P.SpotList=[];
-        P.current=[]
-        self.lb.delete(0, END)
+        if not self.feed_lock('CLEAR SPOT LIST'):
+            return
+        try:
+            P.nspots=0
+            P.SpotList.clear()
+            P.views.clear()
+        finally:
+            P.ClusterFeed.lock.release()
+        self.show_current()
+
+    # Function to re-populate the list box with the spots for the current band
+    def show_current(self):
+        self.shown = SortedSpots(self.P.current)
+        self.render_spots(self.shown)
 
     #########################################################################################
 
@@ -790,34 +850,9 @@ class BandMapGUI:
         if P.GUI_MODE==None:
             P.GUI_MODE = self.mode.get()
                 
-        # Check if we have any new spots
-        Update=False
-        nspots=self.P.bm_q.qsize()
-        #print('BM WATCH DOG - There are',nspots,'new spots in the queue ...')
-        while nspots>0:
-            Update=True
-            entry=self.P.bm_q.get()
-            #print('\tentry=',entry,len(entry))
-            if len(entry)==1:
-                self.lb.delete(entry[0])
-            else:
-                if entry[1]!=None:
-                    self.lb.insert(entry[0], entry[1])
-                try:
-                    self.lb.itemconfigure(entry[0], background=entry[2])
-                except:
-                    error_trap('BM GUI->WATCH DOG: Error in configuring item bg color ????')
-                    print('entry=',entry,'\n')
-                        
-            self.P.bm_q.task_done()
-            nspots=self.P.bm_q.qsize()
-
-        # Check if we need to cull old spots
-        if Update:
-            self.LBsanity()
-            dt = (datetime.now() - self.P.last_check).total_seconds()/60      # In minutes
-            if dt>1:
-                self.cull_old_spots()
+        # New spots are normally handled as soon as they arrive (see NewSpots)
+        # but make sure nothing gets stuck in the queue
+        self.NewSpots()
         
         # Check for antenna or mode or band changes
         # Should combine these two
@@ -869,10 +904,81 @@ class BandMapGUI:
             print('\tWATCHDOG: *** Too many socket timeouts - port is probably closed - giving up -> sys.exit ***\n')
             sys.exit(0)
 
-        # Re-schedule to do it all over again in 1-second
+        # Re-schedule to poll the rig again in 1-second
         self.root.update_idletasks()
         self.root.update()
-        self.root.after(1*1000, self.WatchDog)
+        self.root.after(RIG_POLL_MSEC, self.WatchDog)
+
+    # Function to apply the changes sent by the cluster feed to the list box.
+    # Everything that has piled up is merged so each spot is touched at most once
+    # and if there are lots of changes, e.g. a burst of spots, we just re-draw.
+    def apply_updates(self):
+        t0=stamp()
+        entries=[]
+        while True:
+            try:
+                entries.append( self.P.bm_q.get_nowait() )
+            except queue.Empty:
+                break
+            self.P.bm_q.task_done()
+        if len(entries)==0:
+            return False
+
+        ops=coalesce(entries)
+        #print('APPLY UPDATES: nentries=',len(entries),'\tnops=',len(ops))
+        if len(ops)>MAX_ROW_UPDATES:
+            self.shown = SortedSpots(self.P.current)
+            self.render_spots(self.shown)
+        else:
+            self.update_rows(ops)
+        LATENCY.since('paint',t0)
+        self.P.bm_q.painted()
+        return True
+
+    # Function to change individual rows of the list box
+    def update_rows(self,ops):
+        WSJT = self.P.CLUSTER=='WSJT'
+        for op,x in ops:
+
+            # Take out the old row, if there is one
+            i=self.shown.remove(x)
+            if i>=0:
+                self.lb.delete(i)
+
+            # Put it back in the right spot if it belongs on this band
+            if op==DELETE or x not in self.P.current:
+                continue
+            i=self.shown.insert(x)
+            try:
+                self.lb.insert(i, format_spot(x,WSJT) )
+                self.lb.itemconfigure(i, background=x.color)
+            except:
+                error_trap('BM GUI->UPDATE ROWS: Error in updating row ????')
+                print('op=',op,'\tcall=',x.dx_call,'\ti=',i,'\n')
+        
+    # Function to take a bunch of spots off the display.  Rows that are next
+    # to each other are deleted together, working from the bottom up so the
+    # row numbers we haven't gotten to yet don't change.
+    def delete_rows(self,spots):
+        rows=[]
+        for x in spots:
+            i=self.shown.index(x)
+            if i>=0:
+                rows.append(i)
+        if len(rows)==0:
+            return
+        rows.sort(reverse=True)
+
+        last=first=rows[0]
+        for i in rows[1:]+[None]:
+            if i is not None and i==first-1:
+                first=i
+                continue
+            self.lb.delete(first,last)
+            for j in range(last,first-1,-1):
+                del self.shown[j]
+            if i is not None:
+                last=first=i
 
     #########################################################################################
 
@@ -963,21 +1069,21 @@ class BandMapGUI:
         print('You selected item %d: %s - %s' % (index,value,call))
         self.status_bar.setText("Spot Delete "+value)
 
-        del P.current[index]
+        x=self.shown[index]
+        if not self.feed_lock('LB CENTER CLICK'):
+            return
+        try:
+            P.current.remove(x)
+
+            # Remove all spots for this call from the spot store
+            spots=P.SpotList.remove_call(call)
+            for y in spots:
+                P.views.remove(y)
+        finally:
+            P.ClusterFeed.lock.release()
+        self.shown.remove(x)
         self.lb.delete(index)
-
-        #print('\nCENTER CLICK B4:',len(P.SpotList),P.SpotList)
-        idx=[]
-        i=0
-        for i in range(len(P.SpotList)):
-            x=P.SpotList[i]
-            if hasattr(x, 'dx_call') and x.dx_call==call:
-                idx.append(i)
-        idx.reverse()
-        #print('idx=',idx)
-        for i in idx:
-            x=P.SpotList.pop(i)
-        #print('\nCENTER CLICK AFTER:',len(P.SpotList),P.SpotList)
+        #print('CENTER CLICK: Removed',len(spots),'spots, nspots=',len(P.SpotList))
             
     #########################################################################################
 
@@ -1000,6 +1106,16 @@ class BandMapGUI:
         print(' ')
         return
 
+    # Dump how long spots are taking to get thru each step (msec)
+    def ShowLatency(self):
+        print('\nLATENCY (msec):')
+        print(LATENCY.report())
+        print(' ')
+        s=LATENCY.summary()['total']
+        if s['n']>0:
+            self.status_bar.setText('Spot latency: p50=%.1f  p99=%.1f  max=%.1f ms' % \
+                                    (s['p50'],s['p99'],s['max']))
+
     # Select a new cluster
     def SelectNode(self):
         SERVER = self.node.get()
@@ -1019,18 +1135,18 @@ class BandMapGUI:
     # Toggle DX ONLY mode
     def toggle_dx_only(self):
         self.P.DX_ONLY=self.dx_only.get()
-        self.SelectBands()
+        self.Refilter()
 
     # Toggle NA ONLY mode
     def toggle_na_only(self):
         self.P.NA_ONLY=self.na_only.get()
-        self.SelectBands()
+        self.Refilter()
 
     # Toggle NEW CWOPS ONLY mode
     def toggle_new_cwops_only(self):
         self.P.NEW_CWOPS_ONLY=self.new_cwops_only.get()
         print('TOGGLE CWOPS: ',self.P.NEW_CWOPS_ONLY)
-        self.SelectBands()
+        self.Refilter()
         
     # Toggle showing CW spots
     def toggle_cw(self):
@@ -1041,7 +1157,7 @@ class BandMapGUI:
         else:
             self.P.SHOW_MODES.remove('CW')
         print('TOGGLE CW: AFTER  show_cw=',self.P.SHOW_CW,'\t',self.P.SHOW_MODES)
-        self.SelectBands()
+        self.Refilter()
         self.status_bar.setText("Showing modes "+' '.join(self.P.SHOW_MODES))
         
     # Toggle showing RTTY spots
@@ -1053,7 +1169,7 @@ class BandMapGUI:
         else:
             self.P.SHOW_MODES.remove('RTTY')
         print('TOGGLE RTTY: AFTER  show_rtty=',self.P.SHOW_RTTY,'\t',self.P.SHOW_MODES)
-        self.SelectBands()
+        self.Refilter()
         self.status_bar.setText("Showing modes "+' '.join(self.P.SHOW_MODES))
         
     # Toggle showing DIGI spots
@@ -1065,7 +1181,7 @@ class BandMapGUI:
         else:
             self.P.SHOW_MODES.remove('DIGI')
         print('TOGGLE DIGI: AFTER  show_digi=',self.P.SHOW_DIGI,'\t',self.P.SHOW_MODES)
-        self.SelectBands()
+        self.Refilter()
         self.status_bar.setText("Showing modes "+' '.join(self.P.SHOW_MODES))
         
     # Toggle showing PHONE spots
@@ -1077,7 +1193,7 @@ class BandMapGUI:
         else:
             self.P.SHOW_MODES.remove('PH')
         print('TOGGLE PHONE: AFTER  show_phone=',self.P.SHOW_PHONE,'\t',self.P.SHOW_MODES)
-        self.SelectBands()
+        self.Refilter()
         self.status_bar.setText("Showing modes "+' '.join(self.P.SHOW_MODES))
         
     # Toggle showing of needs for mode
@@ -1131,16 +1247,17 @@ class BandMapGUI:
     # Toggle showing already worked stations
     def toggle_dupes(self):
         self.P.SHOW_DUPES=self.show_dupes.get()
-        self.SelectBands()
+        self.Refilter()
 
     # Toggle showing multipliers
     def toggle_mults(self):
         self.P.SHOW_MULTS=self.show_mults.get()
-        self.SelectBands()
+        self.Refilter(True)
 
     # Toggle logging of raw spots
     def toggle_echo(self):
         self.P.ECHO_ON=self.echo_raw_spots.get()
+        set_log_levels(self.P)
         
     # Toggle showing of needs for this year
     def toggle_need_year(self):
@@ -1374,6 +1491,7 @@ class BandMapGUI:
         Menu1.add_command(label="Settings ...", command=self.Settings)
         Menu1.add_separator()
         Menu1.add_command(label="Show Log ...", command=self.ShowLog)
+        Menu1.add_command(label="Show Latency ...", command=self.ShowLatency)
         Menu1.add_separator()
         Menu1.add_command(label="Exit", command=self.root.quit)        
         
@@ -1476,71 +1594,81 @@ class BandMapGUI:
         return y
 
     
+    # Cull aged spots every so often
+    def CullTimer(self):
+        try:
+            self.cull_old_spots()
+            self.age_spots()
+        except:
+            error_trap('BM GUI->CULL TIMER: Problem culling old spots ???')
+        self.root.after(CULL_MSEC, self.CullTimer)
+
+    # Function to re-color spots that are no longer new (e.g. yellow -> green).
+    # Only the spots that just came of age are looked at.
+    def age_spots(self):
+        P=self.P
+        if not self.feed_lock('AGE SPOTS'):
+            return
+        msgs=[]
+        try:
+            for x in P.SpotList.aged(time.time()):
+                match = P.ClusterFeed.B4(x,str(x.band)+'m')
+                c,c2,age = P.ClusterFeed.spot_color(match,x)
+                if c!=x.color:
+                    P.SpotList.recolor(x,c)
+                    msg = P.ClusterFeed.refile(x)
+                    if msg:
+                        msgs.append(msg)
+        finally:
+            P.ClusterFeed.lock.release()
+        for msg in msgs:
+            P.bm_q.put(msg)
+
+    # Function to grab the cluster feed lock from the gui thread.
+    # Like the feed, we never wait forever - we'll try again next time.
+    def feed_lock(self,who):
+        acq=self.P.ClusterFeed.lock.acquire(timeout=self.P.ClusterFeed.lock_to)
+        if not acq:
+            print(who+': Unable to acquire lock - giving up!')
+        return acq
+
     # Function to cull aged spots
     def cull_old_spots(self):
         P=self.P
-        #logging.info("Calling Get_Freq ...")
-        now = datetime.utcnow().replace(tzinfo=UTC)
-        sock=self.P.sock
-        if sock:
-            frq = sock.get_freq(VFO=self.P.RIG_VFO)
-        else:
-            frq=0
-        #print('SpotList=',P.SpotList)
-        #print("CULL OLD SPOTS - Rig freq=",frq,'\tnspots=',P.nspots,len(P.SpotList),len(P.current),
-        #      '\nmax age=',self.P.MAX_AGE,'\tnow=',now)
-        print("CULL OLD SPOTS - Rig freq=",frq,
-              '\tnspots=',P.nspots,
-              '\tlen SpotList=',len(P.SpotList),
-              '\tlen Current=',len(P.current),
-              '\n\tmax age=',self.P.MAX_AGE,
-              '\tnow=',now)
-
-        self.scrolling('CULL OLD SPOTS A')
-
-        NewList=[];
-        BAND = int( self.band.get().replace('m','') )
-        for x in P.SpotList:
-            try:
-                age = (now - x.time).total_seconds()/60      # In minutes
-            except:
-                error_trap('CULL_OLD_SPOTS: ????')
-                age=0
-                print('x=',x)
-                #pprint(vars(x))
-                print('now=',now)
-                #print('x.time=',x.time)
-                continue
-            
-            keep = x!=None and ((x.cnt>=2 and age<self.P.MAX_AGE) or (x.cnt<2 and age<3))
-            if keep and not self.P.SHOW_DUPES:
-                keep = x.color != 'red'
-            if keep:
-                NewList.append(x)
-            else:
-                print("CULL OLD SPOTS - Removed spot ",x.dx_call,'\t',x.time,'\t',x.frequency,'\t',x.band,"\tage=",age)
+
+        # Only the spots that are due come off the heap so this is cheap.
+        # Hang on to the lock until they're gone so none of them get lost.
+        if not self.feed_lock('CULL OLD SPOTS'):
+            return
+        removed=[]
+        try:
+            P.SpotList.set_ages(self.P.MAX_AGE)
+            expired = P.SpotList.expired(time.time(),self.P.SHOW_DUPES)
+            if len(expired)==0:
+                return
+        
+            GUI_LOG.info('CULL OLD SPOTS - nspots= %d \tlen SpotList= %d \tlen Current= %d \tmax age= %s \tno. expired= %d',
+                         P.nspots,len(P.SpotList),len(P.current),self.P.MAX_AGE,len(expired))
+            self.scrolling('CULL OLD SPOTS A')
+
+            for x in expired:
+                P.SpotList.remove(x)
+                GUI_LOG.debug('CULL OLD SPOTS - Removed spot  %s \t %s \t %s \t %s',
+                              x.dx_call,x.time,x.frequency,x.band)
 
                 # Check if this spot is currently being displayed
-                if x.band==BAND:
-                    idx2 = [i for i,y in enumerate(P.current) 
-                            if y.frequency == x.frequency and y.dx_call == x.dx_call]
-                    #print("Delete",idx2,idx2[0])
-                    if len(idx2)>0:
-                        try:
-                            del P.current[idx2[0]]
-                            self.lb.delete(idx2[0])
-                        except:
-                            error_trap('GUI->CULL OLD SPOTTS: Problem deleting spot???!!!')
-                            print('\tcall=',x.dx_call,'\tfreq=',x.frequency,'\tband=',x.band)
-                            print('\tidx2=',idx2)
+                if x in P.current:
+                    removed.append(x)
+                P.views.remove(x)
+        finally:
+            P.ClusterFeed.lock.release()
 
         # Update gui display
         self.scrolling('CULL OLD SPOTS B')
-        P.SpotList=NewList
+        self.delete_rows(removed)
         self.scrolling('CULL OLD SPOTS C')
-        print("CULL OLD SPOTS - New nspots=",P.nspots,
-              '\tlen SpotList=',len(P.SpotList),
-              '\tlen Current=',len(P.current))
+        GUI_LOG.info('CULL OLD SPOTS - New nspots= %d \tlen SpotList= %d \tlen Current= %d',
+                     P.nspots,len(P.SpotList),len(P.current))
         self.P.last_check=datetime.now()
 
         
@@ -0,0 +1,133 @@
+################################################################################
+#
+# bm_log.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Leveled logging for the busy parts of the code.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import sys
+import queue
+import logging
+from logging.handlers import QueueHandler,QueueListener
+
+################################################################################
+
+ROOT = 'bandmap'
+
+# Each part of the code gets its own logger so we can turn up just the part
+# we're chasing
+SUBSYSTEMS = ['feed',          # Lines coming in from the cluster
+              'digest',        # Spots being digested
+              'gui',           # Spot lists, culling, etc.
+              'udp']           # Messages to & from other apps
+
+LEVELS = {'debug'   : logging.DEBUG,
+          'info'    : logging.INFO,
+          'warning' : logging.WARNING,
+          'error'   : logging.ERROR}
+
+################################################################################
+
+# Function to get the logger for a part of the code, e.g.
+#
+#    LOG = get_log('digest')
+#    LOG.info('DIGEST SPOT: call=%s freq=%s',call,freq)
+#
+# Arguments are only formatted if the message is actually going to be shown,
+# so a message that's turned off costs next to nothing.  Anything that's
+# expensive to put together should check LOG.isEnabledFor() first.
+def get_log(name):
+    return logging.getLogger(ROOT+'.'+name)
+
+# Writes to whatever stdout is at the time, so redirecting stdout (e.g. in
+# bench.py) works the same way as it does for print
+class StdoutHandler(logging.StreamHandler):
+    def emit(self,record):
+        self.stream = sys.stdout
+        logging.StreamHandler.emit(self,record)
+
+# Messages look just like the prints they replaced
+_root = logging.getLogger(ROOT)
+_root.propagate = False
+_handler = StdoutHandler(sys.stdout)
+_handler.setFormatter( logging.Formatter('%(message)s') )
+_root.addHandler(_handler)
+_root.setLevel(logging.WARNING)
+_listener = None
+
+################################################################################
+
+# Function to work out the level for each part of the code.
+#    -debug 0   Only warnings & errors - this is the default so the busy parts are quiet
+#    -debug 1   Info for everything
+#    -debug 2+  Everything
+#    -echo      Raw lines from the cluster (feed) & a line for each spot (digest)
+# -trace digest=debug udp=info ... overrides these for individual parts.
+def log_levels(P):
+    if P.DEBUG>=2:
+        level = logging.DEBUG
+    elif P.DEBUG>=1:
+        level = logging.INFO
+    else:
+        level = logging.WARNING
+    levels = dict( [(name,level) for name in SUBSYSTEMS] )
+
+    if P.ECHO_ON:
+        levels['feed']   = logging.DEBUG
+        levels['digest'] = min(levels['digest'],logging.INFO)
+
+    for item in P.TRACE:
+        try:
+            name,lev = item.split('=')
+            if name not in SUBSYSTEMS:
+                raise KeyError(name)
+            levels[name] = LEVELS[lev.lower()]
+        except:
+            print('BM LOG: Not sure what to do with -trace',item,
+                  '- should be one of',SUBSYSTEMS,'= one of',list(LEVELS.keys()))
+    return levels
+
+# Function to (re-)set the level of each logger - call this whenever the
+# DEBUG or ECHO_ON settings change
+def set_log_levels(P):
+    for name,level in log_levels(P).items():
+        get_log(name).setLevel(level)
+
+# Function to set up logging.  If a file is given, messages are handed off
+# to a background thread that writes them so the busy threads never wait on
+# the disk.
+def setup_logging(P):
+    global _listener
+
+    set_log_levels(P)
+
+    if P.TRACE_FILE and _listener==None:
+        fh = logging.FileHandler(P.TRACE_FILE,mode='w')
+        fh.setFormatter( logging.Formatter('%(asctime)s %(threadName)s %(name)s: %(message)s') )
+        q = queue.Queue(-1)
+        _root.removeHandler(_handler)
+        _root.addHandler( QueueHandler(q) )
+        _listener = QueueListener(q,fh)
+        _listener.start()
+        print('BM LOG: Logging to',P.TRACE_FILE)
+
+# Function to flush anything that's waiting to be written
+def stop_logging():
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
@@ -19,20 +19,39 @@
 #
 #########################################################################################
 
-import sys
 from pprint import pprint
 import zlib
 from utilities import freq2band
 from datetime import datetime
 from collections import OrderedDict
 import pytz
+from spot_store import SortedSpots
+from latency import LATENCY
+from bm_log import get_log
+from spot_proto import pack_spot_list
+from cluster_feed import band2int
 
 #########################################################################################
 
+UDP_LOG = get_log('udp')
+
+#########################################################################################
+
+# Function to send a reply to a client.  Clients that have subscribed to spot
+# changes get it wrapped up so they can tell it from the changes (see spot_subs.py).
+def reply(P,sock,data,framed=False):
+    if isinstance(data,str):
+        data=data.encode()
+    subs=getattr(P,'subs',None)
+    if subs:
+        subs.reply(sock,data,framed)
+    else:
+        sock.send(data)
+
 # UDP Message handler for bandmap
 def bm_udp_msg_handler(self,sock,msg):
     id=sock.getpeername()
-    print('BM UDP MSG HANDLER: id=',id,'\tmsg=',msg.rstrip())
+    UDP_LOG.info('BM UDP MSG HANDLER: id= %s \tmsg= %s',id,msg.rstrip())
 
     if False:
         print("P=")
@@ -42,7 +61,7 @@ def bm_udp_msg_handler(self,sock,msg):
     msgs=msg.split('\n')
     for m in msgs:
         mm=m.split(':')
-        print('BM UDP MSG HANDLER: m=',m,'\tmm[0]=',mm[0])
+        UDP_LOG.debug('BM UDP MSG HANDLER: m= %s \tmm[0]= %s',m,mm[0])
 
         if mm[0]=='Name':
             
@@ -50,43 +69,30 @@ def bm_udp_msg_handler(self,sock,msg):
             if mm[1]=='?':
                 print('BM UDP MSG HANDLER: Server name query')
                 msg2='Name:BANDMAP\n'
-                sock.send(msg2.encode())
+                reply(self.P,sock,msg2)
             else:
                 print('BM UDP MSG HANDLER: Server name is',mm[1])
             return
                 
         elif mm[0]=='RunFreq' and mm[1] in ['UP','DOWN']:
 
-            # Do nothing - this is too slow so its handled in the SDR for now
-            print('BM UDP MSG HANDLER: RunFreq - Move along, Nothing to see here')
-            return
-
             # Sift through spots an find a gap to run in
+            # The spots are kept sorted by freq so we only need to look at
+            # those on the requested side of the run freq
             frq=float(mm[2])
             band = freq2band(1e-3*frq)
             print('BM UDP MSG HANDLER: RunFreq - frq=',frq,'\tband=',band)
-            spots = self.P.bm_gui.collect_spots(band,not mm[1]=='UP',OVERRIDE=True)
-            print('\tspots=',spots)
+            spots = SortedSpots( self.P.bm_gui.collect_spots(band,OVERRIDE=True) )
 
-            flast=None
             MIN_DF=1e-3*500
-            for x in spots:
-                f  = x.frequency
-                if not flast:
-                    flast = f
-                df = abs( f - flast )
-                print('\t',x.dx_call,'\t',flast,'\t',f,'\t',df)
-                if df>MIN_DF:
-                    if (mm[1]=='UP' and flast>frq and f>frq) or \
-                       (mm[1]=='DOWN' and flast<frq and f<frq):
-                        frq2=0.5*(f+flast)
-                        msg='RunFreq:TRY:'+str(frq2)
-                        print('BM UDP MSG HANDLER: RunFreq - Suggested freq=',frq2,
-                              '\nSending msg=',msg)
-                        #self.P.udp_server.Broadcast(msg)
-                        sock.send(msg.encode())
-                        return
-                flast = f
+            frq2 = spots.find_gap(frq,mm[1]=='UP',MIN_DF)
+            if frq2:
+                msg='RunFreq:TRY:'+str(frq2)
+                print('BM UDP MSG HANDLER: RunFreq - Suggested freq=',frq2,
+                      '\nSending msg=',msg)
+                #self.P.udp_server.Broadcast(msg)
+                reply(self.P,sock,msg)
+                return
             print('BM UDP MSG HANDLER: RunFreq - Unable to suggest a freq')
             return
                 
@@ -120,36 +126,57 @@ def bm_udp_msg_handler(self,sock,msg):
             qso['time_off']     = mm[6]
             qso['qth']          = mm[7]
             self.P.qsos.append(qso)
+            self.P.dupes.add(qso)
             print('\tUDP LOG: qso=',qso)
             self.P.SCORING.otf_scoring(qso)
-            self.P.ClusterFeed.lb_update()
-
-            if True:
-                b = int( qso['band'].split("m")[0] )
-                idx = [i for i,x in enumerate(self.P.current) if x.dx_call == qso['call'] and x.band==b]
-                print('\tb=',b,'\tidx=',idx)
-                if len(idx)>0:
-                    print('\tentry=',[idx[0],None, 'red'] )
-                    self.P.bm_q.put( [idx[0],None, 'red'] )
-                else:
-                    #print('\tP.current=',self.P.current)
-                    for x in self.P.current:
-                        print(x,x.dx_call,x.band)
+            self.P.ClusterFeed.lb_update(qso)
+            return
             
+        elif mm[0]=='Stats':
+
+            # Stats:? - how long spots are taking to get thru each step
+            # Reply is Stats:stage=p50/p99 ... (msec)
+            if len(mm)>1 and mm[1]=='?':
+                msg2='Stats:'+LATENCY.brief()+'\n'
+                print('BM UDP MSG HANDLER: Stats query - reply=',msg2.rstrip())
+                reply(self.P,sock,msg2)
             return
             
         elif mm[0]=='SpotList':
             
-            if mm[1]=='Refresh':
-                print('BM UDP MSG HANDLER: Received SpotList Refresh')
+            # SpotList:Subscribe:BAND   - snapshot of band then changes as they happen
+            # SpotList:Unsubscribe[:BAND]
+            # SpotList:Refresh          - new snapshots of subscribed bands, e.g. after a gap
+            if mm[1] in ['Subscribe','Unsubscribe','Refresh']:
+                subs=self.P.subs
+                if not subs:
+                    print('BM UDP MSG HANDLER: Subscriptions not available')
+                elif mm[1]=='Subscribe':
+                    try:
+                        band=band2int(mm[2])
+                    except:
+                        print('BM UDP MSG HANDLER: Subscribe needs a band - mm=',mm)
+                        reply(self.P,sock,'SpotList:Error:Subscribe needs a band, e.g. SpotList:Subscribe:20m\n')
+                        return
+                    subs.subscribe(sock,band)
+                elif mm[1]=='Unsubscribe':
+                    if len(mm)>2:
+                        subs.unsubscribe(sock,band2int(mm[2]))
+                    else:
+                        subs.unsubscribe(sock)
+                else:
+                    subs.refresh(sock)
                 return
             elif mm[1]=='?':
                 band=self.P.GUI_BAND
             else:
                 band=mm[1]
             
+            # SpotList:BAND:?:V1 asks for the binary version of the reply - the
+            # header says which version of the format it is (see spot_proto.py)
+            BINARY = mm[-1].upper() in ['V1','V2']
             if mm[1]=='?' or mm[2]=='?':
-                spot_list_query(self.P,sock,band)
+                spot_list_query(self.P,sock,band,BINARY)
                 
             return
                     
@@ -157,9 +184,9 @@ def bm_udp_msg_handler(self,sock,msg):
      
 
 
-def spot_list_query(P,sock=None,band=None):
+def spot_list_query(P,sock=None,band=None,BINARY=False):
     
-    print('BM UDP SPOTLIST QUERY: band=',band)
+    UDP_LOG.info('BM UDP SPOTLIST QUERY: band= %s',band)
     if not hasattr(P,'gui') and False:
         print('BM UDP SPOTLIST QUERY: No Gui?')
         return
@@ -168,8 +195,19 @@ def spot_list_query(P,sock=None,band=None):
         band=P.GUI_BAND
         print('\tband=',band)
     
-    a=[]
     spots = P.bm_gui.collect_spots(band,OVERRIDE=True)
+
+    # Binary version - see spot_proto.py
+    if BINARY:
+        msg = pack_spot_list(band2int(band),spots)
+        UDP_LOG.info('BM UDP SPOTLIST QUERY: Sending %d spots in %d bytes ...',len(spots),len(msg))
+        if sock:
+            reply(P,sock,msg,framed=True)
+        else:
+            P.udp_server.Broadcast(msg)
+        return
+
+    a=[]
     for x in spots:
         color=x.color
         if color=='lightgreen':
@@ -198,11 +236,9 @@ def spot_list_query(P,sock=None,band=None):
         msg22 = zlib.compress(msg2.encode())
         
         # Check size of text b4 and after compression
-        if True:
-            a_size=sys.getsizeof(msg2)
-            print('msg2=',msg2,'\nSize of original msg',a_size)
-            a2_size=sys.getsizeof(msg22)
-            print("Size of compressed msg:",a2_size)
+        UDP_LOG.debug('msg2= %s',msg2)
+        UDP_LOG.info('Size of original msg %d \tSize of compressed msg: %d',
+                     len(msg2),len(msg22))
 
         # Decompressing text
         #a3=zlib.decompress(msg22)
@@ -212,19 +248,19 @@ def spot_list_query(P,sock=None,band=None):
         #print("Size of decompressed text",a3_size,'\na3=',a3)
         #print("\nDifference of size= ", a_size-a2_size)
 
-        print('BM UDP SPOTLIST QUERY: Sending compressed message ...')
+        UDP_LOG.info('BM UDP SPOTLIST QUERY: Sending compressed message ...')
         if sock:
-            sock.send(msg22)
+            reply(P,sock,msg22)
         else:
             P.udp_server.Broadcast(msg22)
         
     else:
         
-        print('BM UDP SPOTLIST QUERY: Sending message ...')
+        UDP_LOG.info('BM UDP SPOTLIST QUERY: Sending message ...')
         if sock:
-            sock.send(msg2.encode())
+            reply(P,sock,msg2)
         else:
             P.udp_server.Broadcast(msg2)
                     
-    print('BM UDP SPOTLIST QUERY: Done.')
+    UDP_LOG.info('BM UDP SPOTLIST QUERY: Done.')
         
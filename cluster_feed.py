@@ -25,8 +25,8 @@ import re
 import time
 import pytz
 from datetime import datetime
-from dx.spot_processing import Spot,Station
-from pprint import pprint
+from dx.spot_processing import Spot
+from pprint import pprint,pformat
 from fileio import parse_adif
 import logging               
 from pywsjtx.simple_server import SimpleServer 
@@ -34,16 +34,35 @@ from utilities import freq2band, error_trap
 from dx.cluster_connections import *
 import threading
 import queue
+import select
+from collections import OrderedDict
 from rig_io.ft_tables import THIRTEEN_COLONIES
+from station_cache import STATIONS
+from spot_queue import SpotQueue,ADD,UPDATE,DELETE
+from spot_dedup import SpotDedup
+from node_probe import probe_nodes
+from feed_state import FeedState,CONNECTING,LOGGED_IN,STREAMING,STALLED,BACKING_OFF,IDLE
+from line_framer import LineFramer
+from spot_record import SpotRecord
+from latency import LATENCY,stamp
+from bm_log import get_log
 
 #########################################################################################
 
 UTC = pytz.utc
 OLD_WAY=True
 DEFAULT_BAND = '20m'
+MAX_BATCHES = 100               # Max no. of batches of lines waiting to be digested
+READ_TIME_OUT = 1.              # Max time to wait for a line from the cluster (sec)
+REPLAY_DT = .005                # Delay between lines when replaying a file in test mode
+MAX_ERRORS = 10                 # Drop the connection after this many read errors in a row
 
 #########################################################################################
 
+# Loggers for the busy parts
+FEED_LOG   = get_log('feed')
+DIGEST_LOG = get_log('digest')
+
 # Setup basic logging
 logging.basicConfig(
     format="%(asctime)-15s [%(levelname)s] %(funcName)s: %(message)s",
@@ -57,9 +76,44 @@ def cleanup(dxcc):
         dxcc2=dxcc
     return dxcc2
 
+# Function to format a spot for display in the list box.
+# The formatted line is saved with the spot and is only re-done when
+# something that is displayed has changed.
+def format_spot(x,WSJT=False):
+    if WSJT:
+        key=(x.df,x.mode,x.snr)
+    else:
+        if x.mode in ['CW']:
+            val = x.wpm
+        else:
+            val = x.snr
+        key=(x.frequency,x.mode,val)
+    if getattr(x,'row_key',None)==key:
+        return x.row
+
+    dxcc=x.country
+    if WSJT:
+        row="%4d  %-10.10s  %+6.6s %-17.17s %+4.4s" % \
+            (int(x.df),x.dx_call,x.mode,cleanup(dxcc),x.snr)
+    else:
+        row="%-6.1f  %-10.19s  %+6.6s %-15.15s %+4.4s" % \
+            (x.frequency,x.dx_call,x.mode,cleanup(dxcc),val)
+    x.row_key=key
+    x.row=row
+    return row
+
+# Function to convert a band from the gui (e.g. '20m') to what's in the spots
+def band2int(band):
+    if band=='MW':
+        return 160
+    elif 'cm' in band:
+        return int( band.replace('cm','') )
+    else:
+        return int( band.replace('m','') )
+
 # Object to manage telnet feed from dx cluster
 class ClusterFeed:
-    def __init__(self,P,msec):
+    def __init__(self,P,msec,ONLINE=True):
 
         # Init
         print('ClusterFeed Init ...')
@@ -70,12 +124,33 @@ class ClusterFeed:
         self.lock_to=2.0                         # Time out to acquire lock
         self.Reset_Flag = threading.Event()
         self.tn = None
+        self.nodes   = OrderedDict()             # All telnet connections we're reading from
+        self.framers = OrderedDict()             # Splits what comes in from each node into lines
+        self.dedup   = SpotDedup()
+        self.ranking = []                        # Nodes that are alive, best first
+        self.state   = FeedState()
+        self.extras  = {}                        # State of each extra node
+        self.retry_at   = {}                     # When to try an extra node again (None while trying)
+        self.new_nodes  = queue.Queue()          # Extra nodes that have been (re-)opened
+        self.node_errors = {}                    # Read errors for each extra node
+        self.gui_q   = queue.Queue()             # Things for the gui thread to do
         
-        # Open spot server
-        self.open_spot_server()
+        # Open spot server - when we're off-line (e.g. replay), lines are fed
+        # to process_line() by the caller & there is nothing to connect to
+        if not ONLINE:
+            self.state.set(IDLE)
+        else:
+            self.open_spot_server()
+            self.open_extra_nodes()
+            if P.SERVER=='NONE':
+                self.set_state(IDLE)
+            elif self.tn:
+                self.state.connected()
+            else:
+                self.state.failed()
 
         # Open a file to save all of the spots
-        if P.SAVE_SPOTS:
+        if P.SAVE_SPOTS and ONLINE:
             pid = os.getpid()
             #fname ="/tmp/ALL_SPOTS.DAT"
             fname ="/tmp/ALL_SPOTS_"+str(pid)+".DAT"
@@ -84,13 +159,22 @@ class ClusterFeed:
             self.fp=-1
 
         # Create a buffer to communicate spots to gui thread
-        P.bm_q = queue.Queue(maxsize=0)
-
-        # Kick off cluster spot monitor
-        dt=.001*msec
-        self.Timer = threading.Timer(dt, self.Monitor)
-        self.Timer.daemon=True                       # This prevents timer thread from blocking shutdown
-        self.Timer.start()
+        P.bm_q = SpotQueue(maxsize=0)
+
+        # Kick off cluster spot reader and parser.
+        # The reader waits on the connection and passes complete lines to the
+        # parser thru a bounded queue so a burst of spots can't run away with us
+        self.startup = .001*msec
+        self.lines   = queue.Queue(maxsize=MAX_BATCHES)
+        self.Stopper = threading.Event()
+        if not ONLINE:
+            return
+        self.reader  = threading.Thread(target=self.Reader, name='Cluster Reader')
+        self.reader.daemon=True                      # This prevents thread from blocking shutdown
+        self.reader.start()
+        self.parser  = threading.Thread(target=self.Parser, name='Cluster Parser')
+        self.parser.daemon=True
+        self.parser.start()
         
         
     # Function to open spot server
@@ -109,16 +193,27 @@ class ClusterFeed:
         
         elif P.SERVER=='ANY':
 
-            # Go down list of known nodes until we find one we can connect to
+            # Check all of the known nodes at once & go down the list, best
+            # first, until we find one we can connect to.  If the probe comes
+            # up empty, fall back to trying them all in order.
             KEYS=list(P.NODES.keys())
             print('NODES=',P.NODES)
             print('KEYS=',KEYS)
+            if not P.TEST_MODE:
+                self.gui_status("Probing cluster nodes ...")
+                self.ranking = probe_nodes(P.NODES,KEYS,P.MY_CALL)
+                print('RANKING=',self.ranking)
+            if len(self.ranking)>0:
+                KEYS=self.ranking
             
             self.tn=None
             inode=0
             while not self.tn and inode<len(KEYS):
                 key = KEYS[inode]
-                self.P.bm_gui.status_bar.setText("Attempting to open node "+P.NODES[key]+' ...')
+                if not P.NODES[key]:
+                    inode += 1
+                    continue
+                self.gui_status("Attempting to open node "+P.NODES[key]+' ...')
                 self.tn = connection(P.TEST_MODE,P.NODES[key],P.MY_CALL,P.WSJT_FNAME, \
                                   ip_addr=P.WSJT_IP_ADDRESS,port=P.WSJT_PORT)
                 inode += 1
@@ -126,13 +221,12 @@ class ClusterFeed:
                 P.CLUSTER=P.NODES[key]
                 P.SERVER = key
             else:
-                print('\n*** Unable to connect to any node - no internet? - giving up! ***\n')
-                sys.exit(0)
+                print('\n*** Unable to connect to any node - no internet? - will keep trying ***\n')
                 
         else:
 
             # Connect to specified node 
-            self.P.bm_gui.status_bar.setText("Attempting to open "+P.CLUSTER+' ...')
+            self.gui_status("Attempting to open "+P.CLUSTER+' ...')
             self.tn = connection(P.TEST_MODE,P.CLUSTER,P.MY_CALL,P.WSJT_FNAME, \
                               ip_addr=P.WSJT_IP_ADDRESS,port=P.WSJT_PORT)
 
@@ -140,32 +234,116 @@ class ClusterFeed:
             if self.tn:
                 OK=self.test_telnet_connection()
                 if not OK:
-                    print('OPEN_SPOT_SERVER: Whooops!  SERVER=',P.SERVER,'\tOK=',OK)
-                    sys.exit(0)
+                    print('OPEN_SPOT_SERVER: Whooops!  SERVER=',P.SERVER,'\tOK=',OK,' - will keep trying')
+                    self.tn.close()
+                    self.tn=None
             else:
                 if P.SERVER!='NONE':
-                    print('OPEN_SPOT_SERVER: Giving up!  SERVER=',P.SERVER,'\tOK=',OK)
-                    sys.exit(0)
+                    print('OPEN_SPOT_SERVER: No connection - will keep trying.  SERVER=',P.SERVER)
+
+        if self.tn and P.SERVER not in ['NONE','WSJT'] and not P.TEST_MODE:
+            self.add_node(P.SERVER,self.tn,True)
+
+    # Function to open any additional nodes, e.g. RBN plus an AR cluster.
+    # Spots from all of them are read together & cross-node dupes are dropped.
+    def open_extra_nodes(self):
+        P=self.P
+        if P.TEST_MODE or P.SERVER in ['NONE','WSJT'] or not self.tn:
+            return
+        
+        for key in P.EXTRA_NODES:
+            if key in self.nodes or key in ['ANY','NONE']:
+                continue
+            self.gui_status("Attempting to open node "+P.NODES[key]+' ...')
+            self.open_extra_node(key)
+        self.add_new_nodes()
+
+    # Function to (re-)open an extra node.  If it works, the node is handed to
+    # the reader thru the new_nodes queue.  If not, we try again later.
+    def open_extra_node(self,key):
+        P=self.P
+        state = self.extras.setdefault(key,FeedState())
+        state.set(CONNECTING)
+        try:
+            tn = connection(P.TEST_MODE,P.NODES[key],P.MY_CALL,P.WSJT_FNAME)
+            OK = tn and self.test_telnet_connection(tn)
+        except:
+            error_trap('CLUSTER FEED->OPEN EXTRA NODE: Problem connecting to node '+key)
+            OK=False
+        if OK:
+            print('OPEN EXTRA NODE: Connected to',key,P.NODES[key])
+            state.connected()
+            self.new_nodes.put( (key,tn) )
+        else:
+            delay = state.failed()
+            print('OPEN EXTRA NODE: Unable to connect to',key,
+                  '- trying again in %.1f sec' % delay)
+            self.retry_at[key] = time.time()+delay
+
+    # Function to start reading from any extra nodes that have been (re-)opened
+    def add_new_nodes(self):
+        while not self.new_nodes.empty():
+            key,tn = self.new_nodes.get_nowait()
+            self.node_errors[key] = 0
+            self.add_node(key,tn)
+
+    # Function to keep an eye on the extra nodes - any that have gone quiet are
+    # dropped & any that aren't open are tried again once their wait is up.
+    # They're opened in the background so the main node isn't held up.
+    def check_extra_nodes(self):
+        P=self.P
+        if P.TEST_MODE or P.SERVER in ['NONE','WSJT']:
+            return
+        self.add_new_nodes()
+        now = time.time()
+        for key in P.EXTRA_NODES:
+            if key in ['ANY','NONE'] or key==P.SERVER:
+                continue
+            state = self.extras.get(key)
+            if key in self.nodes:
+                if state and state.stalled(now):
+                    print('CLUSTER FEED: Nothing from',key,'for',
+                          int(now-state.last_line),'sec - reconnecting ...')
+                    self.close_extra_node(key)
+            elif self.retry_at.get(key,0)!=None and now>=self.retry_at.get(key,0):
+                self.retry_at[key] = None
+                th = threading.Thread(target=self.open_extra_node,args=(key,),
+                                      name='Open '+key)
+                th.daemon=True
+                th.start()
+
+    # Function to close an extra node & try it again later
+    def close_extra_node(self,key):
+        tn = self.nodes.get(key)
+        self.drop_node(key)
+        try:
+            if tn:
+                tn.close()
+        except:
+            error_trap('CLUSTER FEED->CLOSE EXTRA NODE: Problem closing '+key)
+        state = self.extras.setdefault(key,FeedState())
+        self.retry_at[key] = time.time()+state.failed()
 
     # Function to test a telnet connection
-    def test_telnet_connection(self):
-        #tn=self.tn
+    def test_telnet_connection(self,tn=None):
+        if tn==None:
+            tn=self.tn
         #print('tn=',tn,type(tn),isinstance(tn,SimpleServer))
         
-        if not self.tn:
+        if not tn:
             print('TEST_TELNET_CONNECTION: *** ERROR *** Unexpected null connection')
             return False
-        elif isinstance(self.tn,SimpleServer):
+        elif isinstance(tn,SimpleServer):
             print('TEST TELNET CONNECTION - Simpler server OK')
             return True    
     
         try:
-            line=self.tn.read_very_eager().decode("utf-8")
+            line=tn.read_very_eager().decode("utf-8")
             ntries=0
             while len(line)==0 and ntries<10:
                 ntries+=1
                 time.sleep(1)
-                line=self.tn.read_very_eager().decode("utf-8")
+                line=tn.read_very_eager().decode("utf-8")
             print('TEST TELNET CONNECTION - line=\n',line,'\tlen=',len(line))
             if len(line)==0:
                 print('TEST TELNET CONNECTION - No response - giving up')
@@ -177,68 +355,105 @@ class ClusterFeed:
         print('TEST TELNET CONNECTION - OK!')
         return True
 
-    #
-    def Monitor(self):
+    # Reader thread - waits for lines from the cluster and hands them to the parser
+    def Reader(self):
+
+        time.sleep(self.startup)
+        print('Cluster Reader running ...')
+        while not self.Stopper.is_set():
+            try:
+                if not self.read_once():
+                    break
+            except:
+                # Don't let one bad line or socket take the whole feed down
+                error_trap('CLUSTER FEED->READER: Problem reading from cluster ???')
+                self.snooze(READ_TIME_OUT)
+
+        print('Cluster Reader done.')
+
+    # Function to do one pass of the reader loop.
+    # Returns False if there's nothing more to read.
+    def read_once(self):
 
-        #print('Cluster Monitor ...')
         if self.Reset_Flag.isSet():
             self.Reset_Flag.clear()
             self.Reset()
-        
-        n = self.cluster_feed()
-        if n==0:
-            if self.P.TEST_MODE:
-                print('\n--- MONITOR: EOF! ---')
-                return
-            elif "telent connection closed" in self.last_error:
-                self.enable_scheduler=False
-                print('SCHEDULER - Attempting to reopen node ...')
-                self.SelectNode()
-            else:
-                #print('SCHEDULER - Nothing returned')
-                dt=200          # Wait a bit before querying cluster again
-        else:
-            # We got a spot - see if there are more
+
+        # If the node has gone quiet, assume its dead
+        if self.supervised() and self.state.stalled():
+            print('CLUSTER READER: Nothing from',self.P.SERVER,'for',
+                  int(time.time()-self.state.last_line),'sec - reconnecting ...')
+            self.set_state(STALLED)
+            self.close_primary()
+        self.check_extra_nodes()
+
+        lines = self.cluster_feed()
+        t_read = stamp()
+        if lines==None:
             if self.P.TEST_MODE:
-                dt=5
+                print('\n--- READER: EOF! ---')
+                return False
+            elif not self.supervised():
+                # Nothing to read from - wait a bit before trying again
+                self.snooze(READ_TIME_OUT)
             else:
-                dt=5
-
-        #print('Restarting Cluster Monitor - n=',n,'\tdt=',dt)
-        self.Timer = threading.Timer(.001*dt, self.Monitor)
-        self.Timer.setDaemon(True)   
-        self.Timer.start()
+                # Lost the connection - wait a bit & try again
+                delay = self.state.failed()
+                self.set_state(BACKING_OFF)
+                print('CLUSTER READER: Lost connection to',self.P.SERVER,
+                      '- trying again in %.1f sec' % delay)
+                if self.snooze(delay):
+                    self.reconnect()
+            return True
+        elif len(lines)>0 and self.state.got_lines():
+            self.set_state(STREAMING)
+
+        # Hand the whole batch to the parser - queue is bounded so this
+        # will block if the parser falls behind
+        if len(lines)>0:
+            self.lines.put( (t_read,lines) )
+        if self.P.TEST_MODE and len(lines)>0:
+            time.sleep(REPLAY_DT)
+        return True
+                
+    # Parser thread - digests lines as they come in from the reader
+    def Parser(self):
+        while True:
+            t_read,lines = self.lines.get()
+            LATENCY.since('handoff',t_read)
+            LATENCY.set_origin(t_read)
+            for node,line in lines:
+                try:
+                    if self.dedup.check(node,line):
+                        self.process_line(line,self.nodes.get(node,self.tn))
+                except:
+                    error_trap('CLUSTER FEED->PARSER: Problem digesting line ???')
+                    print('line=',line)
+            self.lines.task_done()
 
 
-    # Function to read spots from the telnet connection
+    # Function to read spots from the cluster connection.
+    # Returns a list of (node,line), an empty list on time out or None if there is
+    # nothing to read from.
     def cluster_feed(self):
 
         P=self.P
-        fp=self.fp
-        VERBOSITY = self.P.DEBUG
-
-        if VERBOSITY>=1:
-            print('CLUSTER FEED A: nspots=',P.nspots,len(P.SpotList),len(P.current))
+        FEED_LOG.debug('CLUSTER FEED A: nspots= %d %d %d',P.nspots,len(P.SpotList),len(P.current))
 
-        if self.nerrors>10:
-            print('CLUSTER_FEED: Too many errors - giving up!',self.nerrors)
-            return 0
+        if self.nerrors>MAX_ERRORS:
+            print('CLUSTER_FEED: Too many errors - dropping connection',self.nerrors)
+            self.close_primary()
 
         if self.P.TEST_MODE:
 
             # Read a line from the recorded spots file
-            if not self.tn.closed:
-                a=self.tn.readline()
-                if a=='':
-                    print('---- EOF ----')
-                    self.tn.close()
-                    return 0
-                else:
-                    #                line=a[2:]
-                    line=a
-            else:
-                return 0
-                line=''
+            if not self.tn or self.tn.closed:
+                return None
+            line=self.tn.readline()
+            if line=='':
+                print('---- EOF ----')
+                self.tn.close()
+                return None
 
             #print('CLUSTER_FEED: line=',line)
                 
@@ -247,10 +462,10 @@ class ClusterFeed:
             spot = self.tn.get_spot2(None,0)
             line = self.tn.convert_spot(spot)
             if line:
-                print('\nCluster Feed: line=',line)
+                FEED_LOG.info('Cluster Feed: line= %s',line)
             else:
-                print('\nCluster Feed: Blank line=',line)
-                print('spot=',spot)
+                FEED_LOG.debug('Cluster Feed: Blank line= %s \tspot= %s',line,spot)
+                line=''
 
             # Check for band changes
             if self.tn.nsleep>=1:
@@ -266,107 +481,267 @@ class ClusterFeed:
                     band2=tmp
                 if band!=band2:
                     print('CLUSTER_FEED: BAND.SET band2=',band2)
-                    self.P.bm_gui.band.set(band2)
-                    self.P.bm_gui.SelectBands()
+                    self.gui_call(self.P.bm_gui.band.set,band2)
+                    self.gui_call(self.P.bm_gui.SelectBands)
 
             # Check for antenna changes
             #self.SelectAnt(-1)
                 
         else:
 
-            # Read a line from the telnet connection
-            if VERBOSITY>=2:
-                print('CLUSTER FEED: Reading tn ...')
-            if self.tn:
-                try:
-                    line = self.tn.read_until(b"\n",self.P.TIME_OUT).decode("utf-8")
-                except ConnectionResetError:
-                    err = error_trap('CLUSTER_FEED: Whooops! Lost connection to cluster server ???')
-                    print('err=',err)
-                    self.tn=None
-                except Exception as e:
-                    err = error_trap('CLUSTER_FEED: Problem reading line from cluster server ...')
-                    print('err=',err)
-                    line = ''
+            # Read from the telnet connection(s) - we sit here until something
+            # shows up and then grab everything that's there
+            if not self.tn:
+                return None
+            return self.read_nodes()
+                
+        if len(line)==0:
+            return []
+        return [(self.P.SERVER,line)]
+
+    # Function to read from the nodes we're connected to.  We wait until at
+    # least one of them has something, grab everything that's there & split
+    # it into lines.  Any partial line is held until the rest of it shows up.
+    def read_nodes(self):
+
+        # A new connection may already have something buffered from logging in
+        framers = list(self.framers.values())
+        if any([f.first for f in framers]):
+            dt=0
+        else:
+            dt=READ_TIME_OUT
+        try:
+            ready,_,_ = select.select(framers,[],[],dt)
+        except:
+            error_trap('CLUSTER_FEED->READ NODES: Problem waiting on nodes ???')
+            self.nerrors+=1
+            return []
+
+        t0=stamp()
+        lines=[]
+        for node,framer in list(self.framers.items()):
+            if framer not in ready and not framer.first:
+                continue
+            primary = framer.tn is self.tn
+            try:
+                n=len(lines)
+                for line in framer.read():
+                    lines.append( (node,line) )
+                if not primary and len(lines)>n and node in self.extras:
+                    self.extras[node].got_lines()
+                    self.node_errors[node] = 0
+            except (EOFError,ConnectionResetError):
+                error_trap('CLUSTER_FEED->READ NODES: Whooops! Lost connection to '+node+' ???')
+                if primary:
+                    self.close_primary()
+                    return lines
+                self.close_extra_node(node)
+            except Exception as e:
+                err = error_trap('CLUSTER_FEED->READ NODES: Problem reading from '+node+' ...')
+                print('err=',err)
+                self.last_error=str(e)
+
+                # Errors on an extra node only count against that node
+                if primary:
                     self.nerrors+=1
-                    self.last_error=str(e)
+                else:
+                    self.node_errors[node] = self.node_errors.get(node,0)+1
+                    if self.node_errors[node]>MAX_ERRORS:
+                        print('CLUSTER_FEED: Too many errors from',node,'- dropping it')
+                        self.close_extra_node(node)
+
+        if len(lines)>0:
+            LATENCY.since('read',t0)
+        if self.P.DEBUG>=2:
+            print('CLUSTER FEED->READ NODES: Got',len(lines),'lines')
+        return lines
+
+    # Function to add a node to the list we're reading from
+    def add_node(self,node,tn,first=False):
+        self.nodes[node]   = tn
+        self.framers[node] = LineFramer(tn)
+        if first:
+            self.nodes.move_to_end(node,last=False)
+            self.framers.move_to_end(node,last=False)
+
+    # Function to stop reading from a node
+    def drop_node(self,node):
+        self.nodes.pop(node,None)
+        self.framers.pop(node,None)
+
+
+    # Function to process a line from the cluster
+    def process_line(self,line,tn=None):
 
-                    #if "telnet connection closed" in err[1]:
-                    #    print("\tLooks like we've lost the connection to the server :-(")
-                
-                if VERBOSITY>=2:
-                    print('Line:',line)
-            else:
-                return 0
+        fp=self.fp
         
-            if line=='': 
-                #print('CLUSTER FEED: Time out ',self.P.TIME_OUT)
-                return 0
-            elif not "\n" in line:
-                # Dont let timeout happen before we get entire line
-                #print 'CLUSTER FEED: Partial line read'
-                try:
-                    line2 = self.tn.read_until(b"\n",timeout=10).decode("utf-8") 
-                    line = line+line2
-                except:
-                    error_trap('CLUSTER_FEED: TIME_OUT2 or other issue ???')
-                    print('line  =',line,type(line))
-                    #print('line2 =',line2,type(line2))
-                    return 0
-
         if len(line)>5:
-            if self.P.ECHO_ON or VERBOSITY>=1:
-                #print('>>> Cluster Feed:',line.rstrip())
-                print('==> ',line.rstrip())
+            #print('>>> Cluster Feed:',line.rstrip())
+            FEED_LOG.info('==>  %s',line.rstrip())
             if self.P.SAVE_SPOTS:
                 fp.write(line.rstrip()+'\n')
                 fp.flush()
 
             # Some clusters ask additional questions
             if line.find("Is this correct?")>=0:
-                self.tn.write(b"Y\n")              # send "Y"
-                return 0
+                if tn==None:
+                    tn=self.tn
+                tn.write(b"Y\n")                   # send "Y"
+                return
 
         # Process the spot
         if len(line)>0 and self.P.data:
+            t0=stamp()
             self.digest_spot(line)
-            
-        return 1
+            LATENCY.since('digest',t0)
 
         
+    # Function to check if we should keep the connection alive - only makes
+    # sense for telnet nodes
+    def supervised(self):
+        P=self.P
+        return not P.TEST_MODE and P.SERVER not in ['NONE','WSJT']
+    
+    # Function to have the gui thread call something for us.  Tk must only be
+    # called from the gui thread so the feed & watchdog threads queue things
+    # up & poke the gui, which calls them in gui_calls().
+    def gui_call(self,func,*args):
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+        else:
+            self.gui_q.put( (func,args) )
+            bm_q = getattr(self.P,'bm_q',None)
+            if bm_q:
+                bm_q.poke()
+
+    # Function to put a message in the gui status bar
+    def gui_status(self,txt):
+        self.gui_call(self.P.bm_gui.status_bar.setText,txt)
+
+    # Function to call whatever was queued for the gui - gui thread only
+    def gui_calls(self):
+        while not self.gui_q.empty():
+            func,args = self.gui_q.get_nowait()
+            try:
+                func(*args)
+            except:
+                error_trap('CLUSTER FEED->GUI CALLS: Problem calling '+str(func))
+
+    # Function to wait a bit.  A reset from the gui cuts this short so the
+    # switch to a new node happens right away.
+    # Returns False if we were interrupted.
+    def snooze(self,delay):
+        self.Reset_Flag.wait(delay)
+        return not self.Reset_Flag.is_set() and not self.Stopper.is_set()
+    
+    # Function to note a change in the state of the connection
+    def set_state(self,state):
+        self.state.set(state)
+        msg = 'Cluster '+self.P.SERVER+': '+self.state.status()
+        print('CLUSTER FEED:',msg)
+        self.gui_status(msg)
+
+    # Function to close the connection to the main node
+    def close_primary(self):
+        self.nerrors=0
+        if self.tn:
+            for node,tn in list(self.nodes.items()):
+                if tn is self.tn:
+                    self.drop_node(node)
+            try:
+                self.tn.close()
+            except:
+                error_trap('CLUSTER FEED->CLOSE PRIMARY: Problem closing connection')
+            self.tn=None
+        
     # Callback to reset telnet connection
     def Reset(self):
         print("\nCLUSTER FEED-> Reset --- Cluster=",self.P.CLUSTER,'\n')
-        self.P.bm_gui.status_bar.setText("RESET - "+self.P.CLUSTER)
-        self.nerrors=0
-        self.P.bm_gui.Clear_Spot_List()
+        self.gui_status("RESET - "+self.P.CLUSTER)
+        self.clear_spots()
+        self.state.nfails=0
+        self.reconnect()
+
+    # Function to clear out all the spots when we switch nodes
+    def clear_spots(self):
+        P=self.P
+        acq=self.lock.acquire(timeout=self.lock_to)
+        if not acq:
+            print('CLEAR SPOTS: Unable to acquire lock - giving up!')
+            return
+        try:
+            P.nspots=0
+            P.SpotList.clear()
+            P.views.clear()
+        finally:
+            self.lock.release()
+        self.gui_call(P.bm_gui.show_current)
+        
+    # Function to (re-)open the connection to the main node
+    def reconnect(self):
 
         # Close down existing connection
         if self.tn:
-            self.tn.close()
+            self.close_primary()
             time.sleep(.1)
             
+        self.set_state(CONNECTING)
         try:
-            self.tn = connection(self.P.TEST_MODE,self.P.CLUSTER, \
-                                 self.P.MY_CALL,self.P.WSJT_FNAME)
-            print("CLUSTER FEED->Reset --- Connected to",self.P.CLUSTER,'\ttn=',self.tn)
-            OK=self.test_telnet_connection()
+            if self.P.SERVER=='ANY':
+                # Never got connected in the first place - start from scratch
+                self.open_spot_server()
+                OK = self.tn!=None
+            else:
+                self.tn = connection(self.P.TEST_MODE,self.P.CLUSTER, \
+                                     self.P.MY_CALL,self.P.WSJT_FNAME)
+                print("CLUSTER FEED->Reset --- Connected to",self.P.CLUSTER,'\ttn=',self.tn)
+                OK=self.test_telnet_connection()
         except:
             error_trap('CLUSTER FEED->Reset --- Problem connecting to node'+self.P.CLUSTER)
             OK=False
             
+        if not OK and self.failover():
+            OK=True
         if not OK:
             print("CLUSTER FEED->Reset --- Now what Sherlock?! - Looks like we've lost the telnet connect ***\n")
-            self.P.bm_gui.status_bar.setText('Lost telnet connection?!')
+            self.gui_status('Lost telnet connection?!')
             self.tn = None
+            return
+        
+        self.state.reconnects+=1
+        self.state.connected()
+        self.set_state(LOGGED_IN)
+        if self.P.SERVER not in ['NONE','WSJT'] and not self.P.TEST_MODE:
+            self.add_node(self.P.SERVER,self.tn,True)
 
 
 
+    # Function to switch to the next best node that we know is alive
+    def failover(self):
+        P=self.P
+        for key in self.ranking:
+            if key==P.SERVER or key in self.nodes:
+                continue
+            print('CLUSTER FEED->FAILOVER: Trying',key,P.NODES[key],'...')
+            self.gui_status("Failing over to "+key+' ...')
+            try:
+                tn = connection(P.TEST_MODE,P.NODES[key],P.MY_CALL,P.WSJT_FNAME)
+                OK = tn and self.test_telnet_connection(tn)
+            except:
+                error_trap('CLUSTER FEED->FAILOVER: Problem connecting to node '+key)
+                OK=False
+            if OK:
+                self.tn = tn
+                P.SERVER  = key
+                P.CLUSTER = P.NODES[key]
+                self.gui_call(self.P.bm_gui.node.set,key)
+                return True
+        return False
+
     # Function to read spots from the telnet connection
     def digest_spot(self,line):
 
         P=self.P
-        VERBOSITY = self.P.DEBUG
         #if P.GUI_BAND==None:
         #    P.GUI_BAND = self.P.bm_gui.band.get()
             
@@ -376,19 +751,20 @@ class ClusterFeed:
             qso=parse_adif(-1,line)
             #print('qso=',qso)
             self.P.qsos.append( qso[0] )
+            self.P.dupes.add( qso[0] )
             #print('self.qsos=',self.qsos)
-            self.lb_update()
+            self.lb_update( qso[0] )
 
         if self.P.CLUSTER=='WSJT':
-            print('SPOT:',line,len(line))
+            DIGEST_LOG.debug('SPOT: %s %d',line,len(line))
+        t0  = stamp()
         obj = Spot(line)
+        LATENCY.since('parse',t0)
         if obj.spotter_call!=P.MY_CALL:
             obj.snr=''
 
-        if self.P.ECHO_ON:
-            print('OBJ:')
-            pprint(vars(obj))
-        sys.stdout.flush()
+        if FEED_LOG.isEnabledFor(logging.DEBUG):
+            FEED_LOG.debug('OBJ:\n%s',pformat(vars(obj)))
 
         # Check if we got a new spot
         if not hasattr(obj, 'dx_call'):
@@ -398,6 +774,7 @@ class ClusterFeed:
         else:
 
             dx_call=obj.dx_call
+            call0=dx_call
 
             # Fix common mistakes
             keep=True
@@ -419,6 +796,14 @@ class ClusterFeed:
                 dx_call = dx_call[:-3]
                 obj.dx_call = dx_call
 
+            # Spot() already got the station info from the cache (see
+            # station_cache.py) but if the call was corrected, we need the
+            # info for the corrected call
+            if keep and dx_call!=call0:
+                t0=stamp()
+                obj.dx_station = STATIONS.get(dx_call)
+                LATENCY.since('station',t0)
+
             # Reject FT8/4 spots if we're in a contest
             m = self.P.GUI_MODE
             if self.P.CONTEST_MODE:
@@ -435,8 +820,7 @@ class ClusterFeed:
 
                 # Filter out NCDXF beacons
                 elif 'NCDXF' in line or 'BEACON' in line or '/B' in dx_call:
-                    if VERBOSITY>=1:
-                        print('Ignoring BEACON:',line.strip())
+                    DIGEST_LOG.info('Ignoring BEACON: %s',line.strip())
                     keep=False
         
             if False:
@@ -452,18 +836,16 @@ class ClusterFeed:
                     print('DIGEST_SPOT: Unable to acquire lock - giving up!')
                     print('line=',line.strip())
                     return
+                msg=None
                     
                 # Highlighting in WSJT-X window
                 if self.P.CLUSTER=='WSJT':
-                    for qso in self.P.qsos:
-                        if self.P.CW_SS:
-                            # Can only work each station once regardless of band in this contest
-                            match = dx_call==qso['call']
-                        else:
-                            match = (dx_call==qso['call']) and (b==qso['band'])
-                        if match:
-                            break
+                    if self.P.CW_SS:
+                        # Can only work each station once regardless of band in this contest
+                        match = self.P.dupes.last_worked(dx_call) != None
                     else:
+                        match = self.P.dupes.last_worked(dx_call,b) != None
+                    if not match:
                         # Set background according to SNR to call attention to stronger sigs
                         fg=1                       # 1=Red
                         try:
@@ -485,8 +867,8 @@ class ClusterFeed:
                 mode=obj.mode
                 band=obj.band  # w/o m at end
                 P.nspots+=1
-                print('DIGEST SPOT: call=',obj.dx_call,'\tfreq=',freq,'\tmode=',mode,
-                      '\tband=',band,'\tnspots=',P.nspots)
+                DIGEST_LOG.info('DIGEST SPOT: call= %s \tfreq= %s \tmode= %s \tband= %s \tnspots= %d',
+                                obj.dx_call,freq,mode,band,P.nspots)
 
                 dxcc=obj.dx_station.country
                 if dxcc==None and False:
@@ -513,9 +895,11 @@ class ClusterFeed:
                 obj.new_mult=self.P.SCORING.new_multiplier(obj.dx_call,band)
             
                 # Determine color for this spot
+                t0=stamp()
                 match = self.B4(obj,str(band)+'m')
                 c,c2,age=self.spot_color(match,obj)
                 obj.color=c
+                LATENCY.since('b4',t0)
                 
                 # Check if this call is already there
                 # Need some error trapping here bx we seem to get confused sometimes
@@ -524,157 +908,55 @@ class ClusterFeed:
                 except:
                     b = ''
 
-                try:
-                    # Indices of all matches
-                    idx1 = [i for i,x in enumerate(P.SpotList)
-                            if x.dx_call==dx_call and x.band==band and x.mode==mode]
-                    #if x.dx_call==dx_call and x.band==band]
-                except:
-                    idx1 = []
+                # Look for this call in the spot store - the store keeps things
+                # indexed by (call,band,mode) so this is a simple lookup
+                x = P.SpotList.find(dx_call,band,mode)
 
-                if len(idx1)>0:
+                if x is not None:
 
                     # Call already in list - Update spot info
-                    obj.cnt=+1
-                    if VERBOSITY>=1:
-                        print("DIGEST SPOT: Dupe call =",dx_call,'\tfreq=',freq,
-                              '\tmode=',mode,'\tband=',band,'\tidx1=',idx1)
-                    for i in idx1:
-                        if VERBOSITY>=2:
-                            print('\tA i=',i,P.SpotList[i].dx_call,
-                                  '\ttime=',P.SpotList[i].time,obj.time,
-                                  '\tfreq=',P.SpotList[i].frequency,obj.frequency)
-                        P.SpotList[i].time=obj.time
-                        P.SpotList[i].frequency=obj.frequency
-                        P.SpotList[i].snr=obj.snr
-                        P.SpotList[i].wpm=obj.wpm
-                        P.SpotList[i].color=obj.color
-                        if self.P.CLUSTER=='WSJT':
-                            P.SpotList[i].df=obj.df
-                        if VERBOSITY>=2:
-                            print('\tB i=',i,P.SpotList[i].dx_call,
-                                  '\ttime=',P.SpotList[i].time,obj.time,
-                                  '\tfreq=',P.SpotList[i].frequency,obj.frequency)
-
-                    # Update list box entry
-                    idx2 = [i for i,x in enumerate(P.current) if x.dx_call == dx_call and x.band==b]
-                    if len(idx2)>0:
-                        self.P.bm_q.put( [idx2[0]] )
-                        if self.P.CLUSTER=='WSJT':
-                            df = obj.df
-                            try:
-                                df=int(df)
-                                entry="%4d  %-10.10s  %+6.6s %-17.17s %+4.4s" % \
-                                    (df,dx_call,mode,cleanup(dxcc),obj.snr)
-                                self.P.bm_q.put( [idx2[0], entry, obj.color] )
-                            
-                                i=idx[0]
-                                P.current[i].time=obj.time
-                                P.current[i].frequency=obj.frequency
-                                P.current[i].snr=obj.snr
-                                P.current[i].df=obj.df
-                                P.current[i].color=obj.color
-                            except:
-                                error_trap('DIGEST SPOT: ?????')
-                        else:
-                            if mode in ['CW']:
-                                val = obj.wpm
-                            else:
-                                val = obj.snr
-                            entry="%-6.1f  %-10.19s  %+6.6s %-15.16s %+4.4s" % \
-                                (freq,dx_call,mode,cleanup(dxcc),val)
-                            self.P.bm_q.put( [idx2[0], entry, obj.color] )
+                    DIGEST_LOG.info('DIGEST SPOT: Dupe call = %s \tfreq= %s \tmode= %s \tband= %s \tcnt= %s',
+                                    dx_call,freq,mode,band,x.cnt)
+                    DIGEST_LOG.debug('\tA  %s \ttime= %s %s \tfreq= %s %s',
+                                     x.dx_call,x.time,obj.time,x.frequency,obj.frequency)
+                    P.SpotList.update(x,obj)
+                    DIGEST_LOG.debug('\tB  %s \ttime= %s %s \tfreq= %s %s',
+                                     x.dx_call,x.time,obj.time,x.frequency,obj.frequency)
+
+                    # Update list box entry - the freq may have changed so
+                    # move it to its new position in the sorted list.  The
+                    # color may have changed too so it might not pass the
+                    # filters anymore (or might now).
+                    msg = self.refile(x)
                     
                 else:
                     
-                    # New call - maintain a list of all spots sorted by freq 
-                    print("DIGEST SPOT: New call  =",dx_call,'\tfreq=',freq,
-                          '\tmode=',mode,'\tband=',band)
+                    # New call - maintain a list of all spots sorted by freq.
+                    # Only the compact version of the spot is kept.
+                    DIGEST_LOG.info('DIGEST SPOT: New call  = %s \tfreq= %s \tmode= %s \tband= %s',
+                                    dx_call,freq,mode,band)
                     obj.cnt=1
-                    P.SpotList.append( obj )
-                    #                P.SpotList.sort(key=lambda x: x.frequency, reverse=False)
-
-                    # Show only those spots on the list that are from the desired band
-                    try:
-                        if self.P.GUI_BAND=='MW':
-                            BAND=DEFAULT_BAND = '20m'
-                        else:
-                            BAND = int( self.P.GUI_BAND.replace('m','') )
-                    except:
-                        error_trap('DIGEST SPOT: ?????')
-                        print('band=',self.P.GUI_BAND)
+                    obj.cwops=self.cwops_worked_status(obj.dx_call)
+                    rec = SpotRecord.from_spot(obj)
+                    P.SpotList.insert( rec )
+
+                    # Every band has its own list of spots that pass the filters,
+                    # not just the one we're looking at, so switching bands is quick.
+                    if not P.filter(rec):
                         self.lock.release()
-                        return
-                    
-                    now = datetime.utcnow().replace(tzinfo=UTC)
-                    if band==BAND:
-
-                        # Cull out U.S. stations, except SESs (Useful for chasing DX)
-                        dxcc = obj.dx_station.country
-                        if self.P.DX_ONLY and dxcc=='United States' and len(obj.dx_call)>3:
-                            self.lock.release()
-                            return True
-
-                        # Cull out stations not in North America (useful for NAQP for example)
-                        cont = obj.dx_station.continent
-                        #print('cont=',cont)
-                        if self.P.NA_ONLY and cont!='NA':
-                            self.lock.release()
-                            return True
-
-                        # Cull out stations non-cwops or cwops we've worked this year - useful for ACA
-                        status=self.cwops_worked_status(obj.dx_call)
-                        if self.P.NEW_CWOPS_ONLY and status!=1:
-                            self.lock.release()
-                            return True                    
-
-                        # Cull out modes we are not interested in
-                        xm = obj.mode
-                        if xm in ['FT8','FT4','DIGITAL','JT65']:
-                            xm='DIGI'
-                        elif xm in ['SSB','LSB','USB','FM']:
-                            xm='PH'
-                        if xm not in self.P.SHOW_MODES:
-                            #print('DIGEST SPOT: Culling',xm,'spot - ', self.P.SHOW_MODES)
-                            self.lock.release()
-                            return True
-
-                        # Cull dupes
-                        if not self.P.SHOW_DUPES:
-                            if obj.color=='red':
-                                self.lock.release()
-                                return True
-                    
-                        # Find insertion point - This might be where the sorting problem is - if two stations have same freq?
-                        idx2 = [i for i,x in enumerate(P.current) if x.frequency > freq]
-                        if len(idx2)==0:
-                            idx2=[len(P.current)];
-                        if False:
-                            print('INSERT: len(current)=',len(P.current))
-                            print('freq=',freq,dx_call)
-                            print('idx2=',idx2)
-                            for cc in P.current:
-                                print(cc.dx_call,cc.frequency)
-                        P.current.insert(idx2[0], obj )
-
-                        if self.P.CLUSTER=='WSJT':
-                            df = int( obj.df )
-                            entry="%4d  %-10.10s  %+6.6s %-17.17s %+4.4s" % \
-                                (df,dx_call,mode,cleanup(dxcc),obj.snr)
-                        else:
-                            if mode in ['CW']:
-                                val = obj.wpm
-                            else:
-                                val = obj.snr
-                            entry="%-6.1f  %-10.10s  %+6.6s %-15.15s %+4.4s" % \
-                                (freq,dx_call,mode,cleanup(dxcc),val)
-                        self.P.bm_q.put( [idx2[0], entry, obj.color] )
+                        return True
+
+                    # Insert into list of spots for this band - its kept sorted by freq
+                    P.views.insert(rec)
+                    if rec in P.current:
+                        msg = [ADD,rec]
 
-                # Release lock
+                # Release lock before telling the gui so it never has to wait on us
                 self.lock.release()
+                if msg:
+                    self.P.bm_q.put(msg)
                 
-        if VERBOSITY>=1:
-            print('DIGEST SPOT: nspots=',P.nspots,len(P.SpotList),len(P.current))
+        DIGEST_LOG.debug('DIGEST SPOT: nspots= %d %d %d',P.nspots,len(P.SpotList),len(P.current))
         return True
 
             
@@ -682,109 +964,88 @@ class ClusterFeed:
     # Function to check if we've already worked a spotted station
     def B4(self,x,b):
             
-        VERBOSITY = self.P.DEBUG
-        now = datetime.utcnow().replace(tzinfo=UTC)
         dx_call=x.dx_call.upper()
-        nqsos=len(self.P.qsos)
-        if VERBOSITY>0:
-            print('B4: ... call=',dx_call,'\tband=',b,'nqsos=',nqsos)
-        
-        match=False
-        if nqsos>0:
-            for qso in self.P.qsos:
-                #print('QSO=',qso)
-                if self.P.CW_SS:
-                    # Can only work each station once regardless of band in this contest
-                    match = dx_call==qso['call']
-                else:
-                    try:
-                        match = (dx_call==qso['call']) and (b==qso['band'])
-                    except: 
-                        error_trap('GUI->MATCH QSOS: ?????')
-                        match=False
-                        print('dx_call=',dx_call)
-                        print('qso=',qso)
-
-                if match:
-                    t1 = datetime.strptime(now.strftime("%Y%m%d %H%M%S"), "%Y%m%d %H%M%S") 
-                    t2 = datetime.strptime( qso['qso_date_off']+" "+qso["time_off"] , "%Y%m%d %H%M%S")
-                    delta=(t1-t2).total_seconds() / 3600
-                    match = delta < self.P.MAX_HOURS_DUPE
-                    if VERBOSITY>=2:
-                        print('--- Possible dupe ',tag,' for',dx_call,'\tt12=',t1,t2,'\tdelta=',
-                              delta,match)
-                    if match:
-                        print('*** Dupe ***',qso['call'],qso['band'])
-                        break
-
-        return match
-
+        DIGEST_LOG.debug('B4: ... call= %s \tband= %s nqsos= %d',dx_call,b,len(self.P.qsos))
 
-    def match_qsos(self,qso,x,b,now):
-        VERBOSITY = self.P.DEBUG
-        
         if self.P.CW_SS:
             # Can only work each station once regardless of band in this contest
-            match = x.dx_call==qso['call']
+            match = self.P.dupes.is_dupe(dx_call,None,self.P.MAX_HOURS_DUPE)
         else:
-            try:
-                match = (x.dx_call==qso['call']) and (b==qso['band'])
-            except:
-                error_trap('GUI->MATCH QSOS: ?????')
-                match=False
-                print('dx_call=',x.dx_call)
-                print('qso=',qso)
-                
-        #print('\n------MATCH_QSOS: qso=',qso,x.dx_call,match)
+            match = self.P.dupes.is_dupe(dx_call,b,self.P.MAX_HOURS_DUPE)
         if match:
-            t1 = datetime.strptime(now.strftime("%Y%m%d %H%M%S"), "%Y%m%d %H%M%S") 
-            t2 = datetime.strptime( qso['qso_date_off']+" "+qso["time_off"] , "%Y%m%d %H%M%S")
-            delta=(t1-t2).total_seconds() / 3600
-            match = delta< self.P.MAX_HOURS_DUPE
-            if VERBOSITY>=2:
-                print('--- MATCH_QSOS: Possible dupe for',x.dx_call,'\tt12',t1,t2,'\tdelta=',delta,match)
+            DIGEST_LOG.info('*** Dupe *** %s %s',dx_call,b)
 
         return match
 
 
-    def lb_update(self):
+    # Function to recolor spots after a qso has been logged.
+    # Only the spots for the station we just worked need to be looked at.
+    def lb_update(self,qso):
         P=self.P
-        b = P.GUI_BAND
-        print('LB_UPDATE: band =',b)
+        try:
+            call  = qso['call'].upper()
+            band  = qso['band']
+            iband = int( band.lower().replace('cm','').replace('m','') )
+        except:
+            error_trap('LB UPDATE: Unable to decipher qso ???')
+            print('\tqso=',qso)
+            return
+        print('LB_UPDATE: call=',call,'\tband =',band)
 
         # Acquire lock
         acq=self.lock.acquire(timeout=self.lock_to)
         if not acq:
             print('LB UPDATE: Unable to acquire lock - giving up!')
             return
-        
-        if len(P.current)==0:
-            print('LB_UPDATE - Nothing to do.',P.current)
-            self.lock.release()
-            return
 
-        idx=-1
-        now = datetime.utcnow().replace(tzinfo=UTC)
-        for x in P.current:
-            idx+=1
-            for qso in self.P.qsos:
-                match = self.match_qsos(qso,x,b,now)
-                call=qso['call']
-                #print('LB_UPDATE:',call,x.dx_call,match)
-                #match |= call==self.P.MY_CALL
-                if match:
-                    break
-                
-        if idx>=0:
+        if self.P.CW_SS:
+            # Can only work each station once regardless of band in this contest
+            spots = P.SpotList.find_call(call)
+        else:
+            spots = P.SpotList.find_call_band(call,iband)
+
+        msgs=[]
+        for x in spots:
+            match = self.B4(x,band)
             c,c2,age=self.spot_color(match,x)
-            #self.lb.itemconfigure(idx, background=c)
-            self.P.bm_q.put( [idx,None, c] )
-            #print('LB_UPDATE:',dx_call,c)
+            x.cwops=self.cwops_worked_status(x.dx_call)
+            P.SpotList.recolor(x,c)
+            DIGEST_LOG.info('LB_UPDATE: %s %s %s %s',x.dx_call,x.band,x.mode,c)
+
+            # The new color &/or cwops status may change whether the spot
+            # passes the filters so re-file it in the view for its band
+            msg = self.refile(x)
+            if msg:
+                msgs.append(msg)
                 
-        # Release lock
+        # Release lock before telling the gui
         self.lock.release()
+        for msg in msgs:
+            self.P.bm_q.put(msg)
                 
 
+    # Function to put a spot that's changed (freq, color, etc.) in the right
+    # place in the view for its band, or take it out if it no longer passes
+    # the filters.  Call with the lock held.  Returns what the gui needs to
+    # be told, if anything.
+    def refile(self,x):
+        P=self.P
+        shown = x in P.current
+        if P.filter(x):
+            if x not in P.views:
+                P.views.insert(x)
+                if x in P.current:
+                    return [ADD,x]
+            else:
+                P.views.move(x)
+                if shown:
+                    return [UPDATE,x]
+        elif x in P.views:
+            P.views.remove(x)
+            if shown:
+                return [DELETE,x]
+        return None
+
     # Function to determine spot color
     def spot_color(self,match,x):
         P=self.P
@@ -792,7 +1053,7 @@ class ClusterFeed:
         now = datetime.utcnow().replace(tzinfo=UTC)
         age = (now - x.time).total_seconds()/60      # In minutes
         dx_call=x.dx_call.upper()
-        dx_station = Station(dx_call)
+        dx_station = STATIONS.get(dx_call)
         
         # Try to strip out bogus appendices from state QPs - not very effective!
         homecall   = dx_station.homecall
@@ -816,7 +1077,7 @@ class ClusterFeed:
             c="magenta"
             c2='m'
         elif x.need_this_year:
-            print('SPOT COLOR: call=',dx_call,'\tdxcc=',dx_station.country)
+            DIGEST_LOG.info('SPOT COLOR: call= %s \tdxcc= %s',dx_call,dx_station.country)
             c="violet"
             c2='v'
         elif x.need_mode:
@@ -862,7 +1123,7 @@ class ClusterFeed:
     #   2 = call is a cwops member and been worked yet this year
     def cwops_worked_status(self,dx_call):
         if '/' in dx_call:
-            dx_station = Station(dx_call)
+            dx_station = STATIONS.get(dx_call)
             home_call = dx_station.homecall
         else:
             home_call = dx_call
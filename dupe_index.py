@@ -0,0 +1,129 @@
+################################################################################
+#
+# dupe_index.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Index of logged QSOs used to quickly check if a spot is a dupe.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import sys
+import time
+import calendar
+import threading
+from utilities import error_trap
+
+################################################################################
+
+# Function to convert the date & time a qso ended to seconds since the epoch (UTC)
+def qso_epoch(qso):
+    date_off = qso['qso_date_off']
+    time_off = qso['time_off']
+    if len(time_off)==4:
+        time_off+='00'
+    return calendar.timegm( time.strptime(date_off+" "+time_off, "%Y%m%d %H%M%S") )
+
+# Compact version of a logged qso with just what we need to check for dupes.
+# The time the qso ended is converted once, when the qso comes in, so
+# comparisons are just integer math.  The original record is kept for
+# scoring, etc.
+class LoggedQSO:
+    __slots__ = ('call','band','mode','epoch','raw')
+
+    def __init__(self,call,band,mode,epoch,raw=None):
+        self.call  = call
+        self.band  = band
+        self.mode  = mode
+        self.epoch = epoch
+        self.raw   = raw
+
+    def __repr__(self):
+        return 'LoggedQSO(%s,%s,%s,%d)' % (self.call,self.band,self.mode,self.epoch)
+
+    # Age of qso in hours
+    def age(self,now=None):
+        if now==None:
+            now = time.time()
+        return (now - self.epoch)/3600.
+
+# Function to convert a qso from the log into its compact form
+def normalize_qso(qso):
+    return LoggedQSO(sys.intern( qso['call'].upper() ),
+                     sys.intern( qso['band'] ),
+                     sys.intern( qso.get('mode','') ),
+                     qso_epoch(qso), qso)
+
+# Object to keep track of the most recent time we worked each station.
+# Entries are keyed by (call,band) and also by call alone, the latter for
+# contests like ARRL SS where each station can only be worked once.
+# The log is parsed once, as the qsos come in, so checking for a dupe is
+# just a dict lookup.
+class DupeIndex:
+    def __init__(self):
+        self.lock      = threading.Lock()
+        self.log       = []          # Compact version of all qsos
+        self.last_band = {}          # (call,band) -> epoch of most recent qso
+        self.last_call = {}          # call        -> epoch of most recent qso
+
+    def __len__(self):
+        return len(self.last_call)
+
+    # Add a qso to the index - returns its compact version
+    def add(self,qso):
+        try:
+            rec = normalize_qso(qso)
+        except:
+            error_trap('DUPE INDEX->ADD: Unable to index qso ???')
+            print('\tqso=',qso)
+            return None
+        with self.lock:
+            self.log.append(rec)
+            key=(rec.call,rec.band)
+            if rec.epoch > self.last_band.get(key,0):
+                self.last_band[key] = rec.epoch
+            if rec.epoch > self.last_call.get(rec.call,0):
+                self.last_call[rec.call] = rec.epoch
+        return rec
+
+    # Return list of qsos made within the last max_hours
+    def recent(self,max_hours,now=None):
+        if now==None:
+            now = int( time.time() )
+        t0 = now - 3600*max_hours
+        with self.lock:
+            return [rec for rec in self.log if rec.epoch > t0]
+
+    # Add a list of qsos to the index
+    def add_list(self,qsos):
+        for qso in qsos:
+            self.add(qso)
+
+    # Return time of most recent qso with a station or None if we haven't worked it
+    # If band is None, the qso can be on any band
+    def last_worked(self,call,band=None):
+        if band==None:
+            return self.last_call.get(call)
+        else:
+            return self.last_band.get( (call,band) )
+
+    # Check if a station was worked within the last max_hours
+    def is_dupe(self,call,band,max_hours,now=None):
+        t = self.last_worked(call,band)
+        if t==None:
+            return False
+        if now==None:
+            now = int( time.time() )
+        return (now - t) < 3600*max_hours
+
@@ -0,0 +1,106 @@
+################################################################################
+#
+# feed_state.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Keep track of the state of the connection to the cluster.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import time
+import random
+import threading
+
+################################################################################
+
+CONNECTING  = 'connecting'        # Trying to open a connection
+LOGGED_IN   = 'logged-in'         # Connected but haven't seen any spots yet
+STREAMING   = 'streaming'         # Spots are coming in
+STALLED     = 'stalled'           # Connected but nothing has come in for a while
+BACKING_OFF = 'backing-off'       # Waiting a bit before trying again
+IDLE        = 'idle'              # Not connected to a cluster (e.g. -cluster NONE)
+
+BACKOFF_MIN = 2.                  # Initial wait before reconnecting (sec)
+BACKOFF_MAX = 300.                # Max wait before reconnecting (sec)
+STALL_TIME  = 300.                # Reconnect if nothing has come in for this long (sec)
+
+################################################################################
+
+# Object to keep track of the state of the cluster connection.
+# Each failed attempt doubles the time we wait before trying again, up to
+# BACKOFF_MAX.  The wait is jittered so a bunch of us that lost the same
+# node don't all come knocking at the same time.  Once spots start flowing
+# again, the wait goes back to BACKOFF_MIN.
+class FeedState:
+    def __init__(self,backoff_min=BACKOFF_MIN,backoff_max=BACKOFF_MAX,stall_time=STALL_TIME):
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.stall_time  = stall_time
+        self.lock        = threading.Lock()
+        self.state       = CONNECTING
+        self.since       = time.time()
+        self.last_line   = None
+        self.nfails      = 0            # No. of failures since we last saw a spot
+        self.reconnects  = 0            # No. of times we've reconnected
+
+    # Change state - returns True if the state actually changed
+    def set(self,state):
+        with self.lock:
+            if state==self.state:
+                return False
+            self.state = state
+            self.since = time.time()
+        return True
+
+    # Note that something came in from the cluster
+    def got_lines(self,now=None):
+        if now==None:
+            now = time.time()
+        self.last_line = now
+        self.nfails    = 0
+        return self.set(STREAMING)
+
+    # Note that the connection was (re-)opened
+    def connected(self,now=None):
+        if now==None:
+            now = time.time()
+        self.last_line = now
+        return self.set(LOGGED_IN)
+
+    # Note that we lost the connection or couldn't open it.
+    # Returns how long to wait before trying again.
+    def failed(self):
+        delay = min( self.backoff_min * 2**min(self.nfails,20) , self.backoff_max )
+        self.nfails += 1
+        self.set(BACKING_OFF)
+        return 0.5*delay + random.uniform(0,0.5*delay)
+
+    # Check if nothing has come in for a while
+    def stalled(self,now=None):
+        if self.state not in [LOGGED_IN,STREAMING] or self.last_line==None:
+            return False
+        if now==None:
+            now = time.time()
+        return now - self.last_line > self.stall_time
+
+    # Return a short description of the state for the status bar, etc.
+    def status(self,now=None):
+        if now==None:
+            now = time.time()
+        txt = '%s for %d sec' % (self.state,now-self.since)
+        if self.reconnects>0:
+            txt += ' - %d reconnects' % self.reconnects
+        return txt
+
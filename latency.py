@@ -0,0 +1,143 @@
+################################################################################
+#
+# latency.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Keep track of how long spots spend in each step on the way to the screen.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import time
+import threading
+from bisect import bisect_right
+from collections import OrderedDict,deque
+from datetime import datetime
+
+################################################################################
+
+WINDOW = 2000                 # No. of recent samples kept for each step
+
+# Steps a spot goes thru - all times are in msec
+STAGES = OrderedDict([
+    ('read'    , 'Reading & splitting a batch of lines off the sockets'),
+    ('handoff' , 'Waiting for the parser thread'),
+    ('parse'   , 'Spot() parsing, incl. cached station lookups'),
+    ('station' , 'Station lookup for corrected calls'),
+    ('b4'      , 'Dupe check & coloring'),
+    ('digest'  , 'All of digest_spot'),
+    ('queue'   , 'Waiting in the gui queue'),
+    ('paint'   , 'Gui updating the list box'),
+    ('total'   , 'Off the socket to on the screen')])
+
+# Histogram bins (msec)
+BINS = [.1,.3,1,3,10,30,100,300,1000,3000]
+
+################################################################################
+
+# Function to return a monotonic time stamp (sec) - wall clock time can jump
+def stamp():
+    return time.monotonic()
+
+# Rolling set of the most recent times for one step
+class Rolling:
+    def __init__(self,window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count   = 0                   # Total no. ever seen
+
+    def add(self,dt):
+        self.samples.append(1000.*dt)
+        self.count += 1
+
+    # Return a few percentiles & the histogram for the samples in the window
+    def summary(self):
+        vals = sorted(self.samples)
+        n    = len(vals)
+        hist = [0]*(len(BINS)+1)
+        for v in vals:
+            hist[ bisect_right(BINS,v) ] += 1
+        if n==0:
+            return {'n':0, 'count':self.count, 'hist':hist}
+        return {'n'     : n,
+                'count' : self.count,
+                'p50'   : vals[ n//2 ],
+                'p90'   : vals[ min(int(.9*n),n-1) ],
+                'p99'   : vals[ min(int(.99*n),n-1) ],
+                'max'   : vals[-1],
+                'hist'  : hist}
+
+# Object to gather the times for each step.  A spot carries the time its
+# batch came off the socket (its origin) so we can also tell how long the
+# whole trip took.  The origin is kept per thread since spots are digested
+# by the parser thread but also by the udp server.
+class LatencyStats:
+    def __init__(self,window=WINDOW):
+        self.lock   = threading.Lock()
+        self.stages = OrderedDict( [(name,Rolling(window)) for name in STAGES] )
+        self.local  = threading.local()
+
+    # Note how long a step took
+    def add(self,stage,dt):
+        with self.lock:
+            self.stages[stage].add(dt)
+
+    # Note how long a step took, starting at t0 - returns the time now
+    def since(self,stage,t0):
+        t = stamp()
+        self.add(stage,t-t0)
+        return t
+
+    # Set/get when the batch we're working on came off the socket
+    def set_origin(self,t):
+        self.local.origin = t
+    def origin(self):
+        return getattr(self.local,'origin',None)
+
+    def summary(self):
+        with self.lock:
+            return OrderedDict( [(name,r.summary()) for name,r in self.stages.items()] )
+
+    # Return a table of the results
+    def report(self):
+        bins = ['<%g' % b for b in BINS] + ['>%g' % BINS[-1]]
+        lines = ['%-8s %7s %8s %8s %8s %8s  %s' % \
+                 ('Stage','n','p50','p90','p99','max',' '.join(['%5s' % b for b in bins]))]
+        for name,s in self.summary().items():
+            if s['n']==0:
+                continue
+            lines.append('%-8s %7d %8.2f %8.2f %8.2f %8.2f  %s' % \
+                         (name,s['n'],s['p50'],s['p90'],s['p99'],s['max'],
+                          ' '.join(['%5d' % h for h in s['hist']])))
+        return '\n'.join(lines)
+
+    # Short version for the status bar, udp replies, etc.
+    def brief(self):
+        txt=[]
+        for name,s in self.summary().items():
+            if s['n']>0:
+                txt.append('%s=%.1f/%.1f' % (name,s['p50'],s['p99']))
+        return ' '.join(txt)
+
+    # Append the latest results to a file - kept next to the memory monitor output
+    def log(self,fname):
+        try:
+            with open(fname,'a') as fp:
+                fp.write( datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S') + ' ' + self.brief() + '\n' )
+        except Exception as e:
+            print('LATENCY->LOG: Problem writing',fname,'-',e)
+
+################################################################################
+
+# The stats shared by everyone
+LATENCY = LatencyStats()
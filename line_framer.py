@@ -0,0 +1,83 @@
+################################################################################
+#
+# line_framer.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Read everything that's waiting on a telnet connection & split it into lines.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import re
+
+################################################################################
+
+MAX_READ    = 65536           # Max no. of bytes to grab at once
+MAX_PARTIAL = 4096            # Longest partial line we'll hang on to
+
+# Telnet commands - IAC IAC is a literal 0xff, sub-negotiations run from
+# IAC SB to IAC SE and everything else is IAC + cmd (+ option)
+IAC_RE = re.compile(rb'\xff(\xff)|\xff\xfa.*?\xff\xf0|\xff[\xfb-\xfe].|\xff[\xf0-\xfa]',re.DOTALL)
+
+################################################################################
+
+# Once a node is logged in, we read straight from the socket rather than
+# thru telnetlib which pulls in 50 bytes at a time & looks at each byte
+# in Python.  Whatever is waiting is grabbed in one recv and split into
+# complete lines.  A trailing partial line is held until the rest of it
+# shows up so we never sit waiting on half a line.  Any telnet commands
+# that sneak in are stripped out.
+class LineFramer:
+    def __init__(self,tn):
+        self.tn      = tn
+        self.sock    = tn.get_socket()
+        self.partial = b''
+        self.first   = True
+        self.nbytes  = 0
+        self.nlines  = 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    # Grab whatever is waiting & return list of complete lines.
+    # Raises EOFError if the connection was closed.
+    def read(self):
+        if self.first:
+            # Pick up anything telnetlib already buffered during log in
+            self.first = False
+            data = self.tn.read_very_eager()
+        else:
+            data = self.sock.recv(MAX_READ)
+            if not data:
+                raise EOFError('Connection closed by node')
+        return self.frame(data)
+
+    # Split a chunk of data into lines
+    def frame(self,data):
+        self.nbytes += len(data)
+        buf   = self.partial + data
+        parts = buf.split(b'\n')
+        self.partial = parts.pop()
+        if len(self.partial)>MAX_PARTIAL:
+            print('LINE FRAMER: Dropping runaway partial line',self.partial[:80])
+            self.partial = b''
+
+        lines=[]
+        for part in parts:
+            if b'\xff' in part:
+                part = IAC_RE.sub(rb'\1',part)
+            lines.append( part.decode('utf-8',errors='replace')+'\n' )
+        self.nlines += len(lines)
+        return lines
+
@@ -0,0 +1,181 @@
+################################################################################
+#
+# node_probe.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Check which cluster nodes are alive & rank them by how quickly they respond.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import os
+import time
+import json
+import socket
+import threading
+from utilities import error_trap
+
+################################################################################
+
+PROBE_TIMEOUT = 10.           # Max time to spend on any one node (sec)
+PROBE_TTL     = 6*3600        # How long to remember that a node is dead (sec)
+PROBE_CACHE   = '~/.bandmap_nodes.json'
+DEFAULT_PORT  = 23
+
+################################################################################
+
+# Function to split a node address into host & port
+def node_addr(addr):
+    if ':' in addr:
+        host,port = addr.split(':')
+        return host,int(port)
+    else:
+        return addr,DEFAULT_PORT
+
+# Function to check a single node.  We connect, wait for the banner, log in
+# and wait for the first spot, noting how long each of these took.
+def probe_node(key,addr,MY_CALL,timeout=PROBE_TIMEOUT):
+    result = {'node'   : key,
+              'addr'   : addr,
+              'ok'     : False,
+              'banner' : None,          # Time to first banner (sec)
+              'spot'   : None,          # Time to first spot (sec)
+              'time'   : int( time.time() )}
+
+    t0 = time.time()
+    try:
+        host,port = node_addr(addr)
+        sock = socket.create_connection((host,port),timeout=timeout)
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+
+    try:
+        buf=b''
+        logged_in=False
+        while time.time()-t0 < timeout:
+            sock.settimeout( max(timeout-(time.time()-t0),.1) )
+            data = sock.recv(4096)
+            if not data:
+                break
+            buf += data
+            if not logged_in:
+                result['banner'] = time.time()-t0
+                result['ok'] = True
+                sock.sendall( (MY_CALL+'\r\n').encode() )
+                logged_in=True
+            elif b'DX de' in buf:
+                result['spot'] = time.time()-t0
+                break
+            buf = buf[-256:]
+    except socket.timeout:
+        pass
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        sock.close()
+
+    return result
+
+# Function to sort the nodes that responded, quickest first.
+# Nodes that gave us a spot come before those that only gave us a banner.
+def rank_nodes(results):
+    alive = [r for r in results if r['ok']]
+    alive.sort(key=lambda r: (r['spot']==None,r['spot'] or 0,r['banner']))
+    return [r['node'] for r in alive]
+
+################################################################################
+
+# Function to read the results of previous probes
+def read_probe_cache(fname=PROBE_CACHE):
+    fname=os.path.expanduser(fname)
+    if not os.path.isfile(fname):
+        return {}
+    try:
+        with open(fname,'r') as fp:
+            return json.load(fp)
+    except:
+        error_trap('NODE PROBE->READ CACHE: Problem reading '+fname)
+        return {}
+
+# Function to save the results of the latest probe
+def write_probe_cache(cache,fname=PROBE_CACHE):
+    fname=os.path.expanduser(fname)
+    try:
+        with open(fname,'w') as fp:
+            json.dump(cache,fp,indent=1)
+    except:
+        error_trap('NODE PROBE->WRITE CACHE: Problem writing '+fname)
+
+################################################################################
+
+# Function to probe a bunch of nodes at the same time.  Nodes that were dead
+# the last time we looked, within PROBE_TTL, are skipped.
+# We return as soon as any node gives us a spot - there's no point waiting on
+# the slow ones.  The rest keep going in the background & the list that was
+# returned is filled in as they come back, so failover can use them later.
+# The cache is written once they're all done.
+# Returns list of node keys, best first.
+def probe_nodes(NODES,keys,MY_CALL,timeout=PROBE_TIMEOUT,ttl=PROBE_TTL):
+
+    now   = int( time.time() )
+    cache = read_probe_cache()
+    todo  = []
+    for key in keys:
+        if not NODES.get(key):
+            continue
+        old = cache.get(key)
+        if old and not old['ok'] and now-old['time']<ttl and old['addr']==NODES[key]:
+            print('PROBE NODES: Skipping',key,'- dead',(now-old['time'])//60,'min ago')
+            continue
+        todo.append(key)
+
+    # Probe them all at once
+    print('PROBE NODES: Probing',todo,'...')
+    results = []
+    ranking = []
+    lock    = threading.Lock()
+    found   = threading.Event()
+    if len(todo)==0:
+        return ranking
+
+    def worker(key):
+        r = probe_node(key,NODES[key],MY_CALL,timeout)
+        with lock:
+            results.append(r)
+            ranking[:] = rank_nodes(results)
+            done = len(results)==len(todo)
+        if r['spot']!=None or done:
+            found.set()
+        if done:
+            for r in results:
+                cache[r['node']] = r
+                print('PROBE NODES: %-8s ok=%-5s banner=%s spot=%s' % \
+                      (r['node'],r['ok'],r['banner'],r['spot']))
+            write_probe_cache(cache)
+
+    for key in todo:
+        th = threading.Thread(target=worker,args=(key,),name='Probe '+key)
+        th.daemon=True
+        th.start()
+
+    # Wait for the first spot or until everyone has answered.  If we
+    # run out of time, go with the best of whoever has answered so far.
+    t0=time.time()
+    found.wait(timeout+1)
+    with lock:
+        print('PROBE NODES: %d of %d nodes answered in %.1f sec' % \
+              (len(results),len(todo),time.time()-t0))
+        return ranking
+
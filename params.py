@@ -25,7 +25,7 @@ import argparse
 from collections import OrderedDict 
 from rig_io  import CONNECTIONS,RIGS
 from settings import *
-from dx import load_cty_info
+from station_cache import load_cty
 from rig_io import HF_BANDS,VHF_BANDS,CONTEST_BANDS
 from nodes import NODES
 
@@ -48,8 +48,8 @@ class PARAMS:
                               choices=CONNECTIONS+['NONE']+RIGS)
         arg_proc.add_argument("-port", help="TCPIP port",
                               type=int,default=0)
-        arg_proc.add_argument("-cluster", help="Server",
-                              type=str,default="ANY",
+        arg_proc.add_argument("-cluster", help="Server(s) - e.g. RBN W3LPL",
+                              type=str,default=["ANY"],nargs='+',
                               choices=list(NODES.keys()) )
         arg_proc.add_argument("-wsjt", help="wsjt", nargs='*', 
                               type=str,default=None)
@@ -106,6 +106,10 @@ class PARAMS:
                               help='Open setting window')
         arg_proc.add_argument("-debug", help="Debug Level",
                               type=int,default=0)
+        arg_proc.add_argument("-trace", help="Log level for parts of the code - e.g. digest=debug udp=info",
+                              type=str,default=[],nargs='*')
+        arg_proc.add_argument("-trace_file", help="Write log messages to this file instead of stdout",
+                              type=str,default=None)
         args = arg_proc.parse_args()
 
         self.gui             = None
@@ -162,6 +166,8 @@ class PARAMS:
         self.RIG_VFO        = args.vfo
         self.FT4            = args.ft4
         self.DEBUG          = args.debug
+        self.TRACE          = args.trace
+        self.TRACE_FILE     = args.trace_file
         self.SHOW_NEED_MODE = args.show_mode
         self.SHOW_NEED_YEAR = args.show_year
         self.SHOW_DUPES     = not args.nodupes
@@ -182,7 +188,8 @@ class PARAMS:
                 sys.exit(0)
 
         # See     http://www.ng3k.com/misc/cluster.html       for a list 
-        self.SERVER=args.cluster.upper()
+        self.SERVER=args.cluster[0].upper()
+        self.EXTRA_NODES=[node.upper() for node in args.cluster[1:]]
         if self.TEST_MODE:
             self.WSJT_FNAME=self.TEST_FNAME
         else:
@@ -265,7 +272,7 @@ class PARAMS:
         print('LOG_NAME=',self.LOG_NAME,'\tSTAND_ALONE=',self.STAND_ALONE)
 
         # Take care of non-standard location of support files
-        load_cty_info(DIR=self.SETTINGS['MY_DATA_DIR'])
+        load_cty(DIR=self.SETTINGS['MY_DATA_DIR'])
         
         if self.SERVER=="WSJT" or args.buttons:
             self.ALLOW_CHANGES=True
@@ -21,11 +21,12 @@
 ############################################################################################
 
 import sys
-from datetime import datetime, date, tzinfo  
+import time
 import pytz
 from dx.cluster_connections import get_logger
 from dx.spot_processing import Station, Spot, WWV, Comment, ChallengeData
 from fileio import parse_adif
+from dupe_index import normalize_qso
 #from fileio import *
 from pprint import pprint
 from dx.cty import load_cty
@@ -156,20 +157,14 @@ if True:
     
     #calls = [ x['call'] for x in qsos ]
     #print calls
-    now = datetime.utcnow().replace(tzinfo=UTC)
-    print((now,now.replace(tzinfo=None)))
-    #now2 = datetime.strptime(now.strftime("%Y%m%d"), "%Y%m%d")
+    # Convert the qsos once & then its just integer math to find the recent ones
+    now = int( time.time() )
+    print(now)
     qsos2=[]
     for qso in qsos:
-        date_off = datetime.strptime( qso["qso_date_off"]+" "+qso["time_off"] , "%Y%m%d %H%M%S") \
-                           .replace(tzinfo=UTC)
-        age = (now - date_off).total_seconds() # In seconds
-
-        #age = (now - date_off).total_seconds() / 60. # In minutes
-        #print date_off
-        #print age
-        #print age / (24*60.)       # In days
-        #sys.exit(0)
+        rec = normalize_qso(qso)
+        age = now - rec.epoch               # In seconds
+        #print(rec,age/(24*3600.))          # In days
         if age < 5*24*3600:
             qsos2.append(qso)
 
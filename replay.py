@@ -0,0 +1,307 @@
+#!/usr/bin/env -S uv run --script
+#
+# NEW: /home/joea/miniconda3/envs/aa2il/bin/python -u
+# OLD: /usr/bin/python3 -u
+#########################################################################################
+#
+# replay.py - Rev. 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Replay a saved spot file (see -save) thru the same code that digests spots
+# from the cluster, without the gui.  Handy for checking how fast we can chew
+# thru a big contest & for chasing down problems with a particular set of spots.
+#
+# Usage:
+#     replay.py -test /tmp/ALL_SPOTS_1234.DAT                 Real time
+#     replay.py -test /tmp/ALL_SPOTS_1234.DAT -speed 10       10x real time
+#     replay.py -test /tmp/ALL_SPOTS_1234.DAT -fast -quiet    As fast as possible
+#
+# All of the usual bandmap flags (-contest, -dx_only, -modes, etc.) can be used
+# to set things up the same way as the run we're trying to reproduce.
+#
+#########################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+#########################################################################################
+
+import os
+import sys
+import re
+import time
+import argparse
+from params import PARAMS
+from bm_gui import BandMapGUI
+from spot_store import SpotStore,BandViews
+from spot_filter import SpotFilter
+from dupe_index import DupeIndex
+from cluster_feed import ClusterFeed,band2int
+from spot_queue import coalesce
+from scoring import Select_Scoring
+from fileio import parse_adif
+from utilities import error_trap
+from bm_log import setup_logging,stop_logging
+from datetime import datetime
+
+#########################################################################################
+
+TICK = 0.2                      # How often the gui would empty its queue (sec of spot time)
+
+# Spot lines end with the time of the spot, e.g. "... 1234Z" or "... 1234Z FN20"
+TIME_RE = re.compile(r'\s([0-2]\d[0-5]\d)Z\b')
+
+#########################################################################################
+
+# Stand-in for the gui - the cluster feed only needs somewhere to put its messages
+class StatusBar:
+    def __init__(self,verbose=False):
+        self.verbose=verbose
+
+    def setText(self,txt):
+        if self.verbose:
+            print('STATUS:',txt)
+
+class HeadlessGUI:
+    def __init__(self,P):
+        self.P = P
+        self.status_bar = StatusBar(P.DEBUG>0)
+
+    # Same data files, spot lists & culling as the gui
+    read_aux_data  = BandMapGUI.read_aux_data
+    collect_spots  = BandMapGUI.collect_spots
+    cull_old_spots = BandMapGUI.cull_old_spots
+    feed_lock      = BandMapGUI.feed_lock
+
+    def Clear_Spot_List(self):
+        P=self.P
+        P.SpotList.clear()
+        P.views.clear()
+
+    # There's no list box to scroll or delete rows from
+    def scrolling(self,txt,verbosity=0):
+        pass
+
+    def delete_rows(self,spots):
+        pass
+
+#########################################################################################
+
+# Function to read a saved spot file
+def read_spots(fname):
+    with open(os.path.expanduser(fname),'r',errors='replace') as fp:
+        return [line for line in fp if len(line.strip())>0]
+
+# Function to work out when each line came in, in seconds from the first one.
+# The saved files only have the time of each spot to the nearest minute so the
+# lines in each minute are spread out evenly across it.  Lines w/o a time
+# (announcements, etc.) go along with the line before them.
+def schedule(lines):
+
+    # Minute of each line
+    mins=[]
+    t0=None
+    last=0
+    for line in lines:
+        m = TIME_RE.search(line)
+        if m:
+            hhmm = m.group(1)
+            t = 60*int(hhmm[:2]) + int(hhmm[2:])
+            if t0==None:
+                t0=t
+            t -= t0
+            while t<last-12*60:
+                t += 24*60                      # Past midnight
+            if t>=last:
+                last=t
+        mins.append(last)
+
+    # Spread them out
+    counts={}
+    for m in mins:
+        counts[m] = counts.get(m,0)+1
+    times=[]
+    seen={}
+    for m in mins:
+        k = seen.get(m,0)
+        seen[m] = k+1
+        times.append( 60.*(m + float(k)/counts[m]) )
+    return times
+
+# Function to return a few percentiles of a list of times, in msec
+def percentiles(vals):
+    if len(vals)==0:
+        return 0,0,0
+    vals=sorted(vals)
+    n=len(vals)
+    p50 = vals[ n//2 ]
+    p99 = vals[ min(int(.99*n),n-1) ]
+    return 1000*p50,1000*p99,1000*vals[-1]
+
+#########################################################################################
+
+# Function to set things up the same way as the gui does
+def headless_setup(P,band,LOG=True):
+
+    P.nspots=0
+    P.SpotList=SpotStore()
+    P.views=BandViews()
+    P.friends=[]
+    P.most_wanted=[]
+    P.corrections=[]
+    P.members=[]
+    P.qsos=[]
+    P.dupes=DupeIndex()
+    P.last_check=datetime.now()
+    P.SAVE_SPOTS=False
+
+    P.bm_gui = HeadlessGUI(P)
+    P.bm_gui.read_aux_data()
+    P.SCORING=Select_Scoring(P)
+    P.filter=SpotFilter(P)
+
+    P.GUI_BAND = band
+    P.GUI_MODE = 'CW'
+    P.current  = P.views.view( band2int(band) )
+
+    # Load the log so worked stations are colored the same way
+    for fname in [P.LOG_NAME0,P.LOG_NAME]:
+        if fname and LOG:
+            try:
+                logbook = parse_adif(fname,REVISIT=False,verbosity=0)
+                P.qsos += logbook
+                P.dupes.add_list(logbook)
+            except:
+                error_trap('REPLAY: Problem reading log '+str(fname))
+    for rec in P.dupes.recent(P.MAX_HOURS_DUPE):
+        P.SCORING.otf_scoring(rec.raw)
+
+    P.ClusterFeed = ClusterFeed(P,0,ONLINE=False)
+    return P.ClusterFeed
+
+#########################################################################################
+
+# Function to push lines thru the cluster feed.  Lines go thru the same
+# steps as in the parser thread, timing each step.  Every TICK of spot time,
+# the gui queue is emptied the way the gui would.
+def replay(feed,lines,times,speed=1.,FAST=False):
+
+    P=feed.P
+    stages = {'dedup':[], 'digest':[], 'gui':[]}
+    lag    = []
+    ndupes = 0
+    nops   = 0
+
+    def drain():
+        t=time.time()
+        entries=[]
+        while not P.bm_q.empty():
+            entries.append( P.bm_q.get_nowait() )
+            P.bm_q.task_done()
+        if len(entries)>0:
+            coalesce(entries)
+            stages['gui'].append( time.time()-t )
+        return len(entries)
+
+    start = time.time()
+    next_tick = TICK
+    for line,t in zip(lines,times):
+
+        # Wait until its time for this line
+        if not FAST:
+            due = start + t/speed
+            dt  = due - time.time()
+            if dt>0:
+                time.sleep(dt)
+            lag.append( max(time.time()-due,0) )
+        if t>=next_tick:
+            nops += drain()
+            next_tick = TICK*(int(t/TICK)+1)
+
+        t1=time.time()
+        keep = feed.dedup.check('REPLAY',line)
+        t2=time.time()
+        stages['dedup'].append(t2-t1)
+        if not keep:
+            ndupes+=1
+            continue
+        try:
+            feed.process_line(line)
+        except:
+            error_trap('REPLAY: Problem digesting line ???')
+            print('line=',line)
+        stages['digest'].append(time.time()-t2)
+
+    nops += drain()
+    elapsed = time.time()-start
+
+    return {'lines'   : len(lines),
+            'spots'   : P.nspots,
+            'dupes'   : ndupes,
+            'gui ops' : nops,
+            'elapsed' : elapsed,
+            'stages'  : stages,
+            'lag'     : lag}
+
+# Function to print summary of a replay
+def report(stats,span):
+
+    elapsed = max(stats['elapsed'],1e-6)
+    print('\nREPLAY: %d lines, %d spots, %d dupes, %d gui ops in %.2f sec (%.1f min of spots)' % \
+          (stats['lines'],stats['spots'],stats['dupes'],stats['gui ops'],elapsed,span/60.))
+    print('        %.1f lines/sec   %.1f spots/sec' % \
+          (stats['lines']/elapsed,stats['spots']/elapsed))
+    print('        %-8s %8s %10s %10s %10s' % ('Stage','Count','p50 (ms)','p99 (ms)','max (ms)'))
+    for name,vals in list(stats['stages'].items()) + [('lag',stats['lag'])]:
+        if len(vals)>0:
+            p50,p99,pmax = percentiles(vals)
+            print('        %-8s %8d %10.3f %10.3f %10.3f' % (name,len(vals),p50,p99,pmax))
+
+#########################################################################################
+
+# Begin executable
+if __name__ == "__main__":
+
+    # Our own flags - everything else goes to PARAMS
+    arg_proc = argparse.ArgumentParser(add_help=False)
+    arg_proc.add_argument("-speed", help="Replay speed (x real time)",
+                          type=float,default=1.)
+    arg_proc.add_argument('-fast', action='store_true',help='As fast as possible')
+    arg_proc.add_argument("-band", help="Band shown in gui",
+                          type=str,default='20m')
+    arg_proc.add_argument('-quiet', action='store_true',help='Only print summary')
+    args,rest = arg_proc.parse_known_args()
+    if '-test' not in rest:
+        rest.append('-test')
+    sys.argv = sys.argv[:1] + rest
+
+    P=PARAMS()
+    setup_logging(P)
+    print('\nREPLAY: Reading',P.TEST_FNAME,'...')
+    lines = read_spots(P.TEST_FNAME)
+    times = schedule(lines)
+    span  = times[-1] if len(times)>0 else 0
+    if args.fast:
+        print('REPLAY:',len(lines),'lines - as fast as possible')
+    else:
+        print('REPLAY:',len(lines),'lines over %.1f min at %gx' % (span/60.,args.speed))
+
+    feed = headless_setup(P,args.band)
+
+    if args.quiet:
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull,'w')
+    stats = replay(feed,lines,times,args.speed,args.fast)
+    if args.quiet:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    stop_logging()
+    report(stats,span)
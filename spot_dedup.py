@@ -0,0 +1,105 @@
+################################################################################
+#
+# spot_dedup.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Weed out spots that arrive from more than one cluster node.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import re
+import time
+import threading
+from collections import OrderedDict
+
+################################################################################
+
+DEDUP_WINDOW = 120            # How long to remember a spot (sec)
+
+# DX de W3LPL-#:   14025.0  K1ABC        CW 22 dB 25 WPM CQ           1234Z
+SPOT_RE = re.compile(r'^DX de\s+[^:\s]+:?\s+([0-9.]+)\s+(\S+).*?(\d{4})Z')
+
+################################################################################
+
+# When we're connected to several nodes, e.g. RBN plus an AR cluster, the
+# same spot tends to show up from each of them.  We remember which node
+# each spot came from, keyed by call, freq rounded to the nearest kHz and
+# the minute it was spotted, and drop copies that come in from a different
+# node within a short window.  Repeats from the same node are passed along
+# since that's how multiple skimmers hearing a station get counted.
+class SpotDedup:
+    def __init__(self,window=DEDUP_WINDOW):
+        self.window = window
+        self.lock   = threading.Lock()
+        self.seen   = OrderedDict()       # key -> [node,time]
+        self.nlines = OrderedDict()       # node -> no. lines received
+        self.ndupes = OrderedDict()       # node -> no. lines dropped as dupes
+        self.t0     = time.time()
+
+    # Return key used to match up spots or None if this isn't a spot
+    def key(self,line):
+        m = SPOT_RE.match(line)
+        if not m:
+            return None
+        try:
+            frq = int( round( float(m.group(1)) ) )
+        except ValueError:
+            return None
+        return (m.group(2).upper(),frq,m.group(3))
+
+    # Returns True if a line should be processed, False if its a cross-node dupe
+    def check(self,node,line,now=None):
+        if now==None:
+            now = time.time()
+        key = self.key(line)
+        with self.lock:
+            self.nlines[node] = self.nlines.get(node,0) + 1
+            if key==None:
+                return True
+            self.purge(now)
+
+            prev = self.seen.get(key)
+            if prev and prev[0]!=node:
+                self.ndupes[node] = self.ndupes.get(node,0) + 1
+                return False
+
+            self.seen[key] = [node,now]
+            self.seen.move_to_end(key)
+            return True
+
+    # Forget spots older than the window - oldest entries are at the front
+    def purge(self,now):
+        t0 = now - self.window
+        while len(self.seen)>0:
+            key,(node,t) = next(iter(self.seen.items()))
+            if t>=t0:
+                break
+            del self.seen[key]
+
+    # Return per-node line rates & dupe ratios
+    def stats(self,now=None):
+        if now==None:
+            now = time.time()
+        dt = max(now - self.t0, 1.)
+        stats = OrderedDict()
+        with self.lock:
+            for node,n in self.nlines.items():
+                ndupes = self.ndupes.get(node,0)
+                stats[node] = {'lines'    : n,
+                               'rate'     : 60.*n/dt,         # Lines per minute
+                               'dupes'    : ndupes,
+                               'dupe pct' : 100.*ndupes/n}
+        return stats
+
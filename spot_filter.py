@@ -0,0 +1,87 @@
+################################################################################
+#
+# spot_filter.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Decide which spots get shown.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+################################################################################
+
+# Modes are lumped together the same way as the Show Modes menu
+MODE_CLASSES = {'FT8'     : 'DIGI',
+                'FT4'     : 'DIGI',
+                'DIGITAL' : 'DIGI',
+                'JT65'    : 'DIGI',
+                'SSB'     : 'PH',
+                'LSB'     : 'PH',
+                'USB'     : 'PH',
+                'FM'      : 'PH'}
+
+# Special event stations that are shown even in DX only mode
+SPECIAL_EVENT = ['WM3PEN']
+
+################################################################################
+
+# Function to figure out which class a mode belongs to
+def mode_class(mode):
+    return MODE_CLASSES.get(mode,mode)
+
+# Function to check if a station is in the U.S.  1x1 calls & a few special
+# event stations don't count since they're worth chasing.
+def stateside(call,country):
+    return country=='United States' and len(call)>3 and call not in SPECIAL_EVENT
+
+################################################################################
+
+# Predicate to decide if a spot should be shown, e.g.
+#
+#    keep = P.filter(x)
+#
+# The settings are looked at once, when the filter is built, and only the
+# checks that are actually turned on get run.  The checks use attributes
+# that are worked out once per spot (SpotRecord.mode_class, continent, etc.)
+# so there are no string games for each spot.  Build a new one whenever one
+# of the settings changes.
+class SpotFilter:
+    def __init__(self,P,show_dupes=None):
+        if show_dupes==None:
+            show_dupes = P.SHOW_DUPES
+        self.show_modes = set(P.SHOW_MODES)
+
+        self.tests=[]
+        if P.DX_ONLY:
+            self.tests.append( lambda x: not x.stateside )
+        if P.NA_ONLY:
+            self.tests.append( lambda x: x.continent=='NA' )
+        if P.NEW_CWOPS_ONLY:
+            self.tests.append( lambda x: x.cwops==1 )
+        self.tests.append( lambda x: x.mode_class in self.show_modes )
+        if not show_dupes:
+            self.tests.append( lambda x: x.color!='red' )
+
+    def __call__(self,x):
+        for test in self.tests:
+            if not test(x):
+                return False
+        return True
+
+    # Return the spots in a list that pass the filter
+    def filter(self,spots):
+        for test in self.tests:
+            spots = [x for x in spots if test(x)]
+        return spots
+
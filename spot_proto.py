@@ -0,0 +1,203 @@
+################################################################################
+#
+# spot_proto.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Binary messages for sending spot lists to other apps (keyer, sdr, etc.)
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+#
+# Each message is a fixed header followed by the payload:
+#
+#    magic    2s   b'BM'
+#    version  B    VERSION
+#    flags    B    COMPRESSED if the payload was zlib'ed
+#    type     B    SPOT_LIST, etc.
+#    (pad)    x
+#    band     H    e.g. 20 for 20m, 70 for 70cm
+#    seq      I    Sequence no. (0 for a one-off reply)
+#    length   I    No. of bytes in the payload as sent
+#
+# The payload of a SPOT_LIST is a list of fixed-size records:
+#
+#    call     12s  Null padded
+#    freq     Q    Hz - 64 bits so microwave spots (e.g. 3cm) fit
+#    band     H
+#    color    B    Index into COLORS
+#    (pad)    x
+#
+# Subscribers (see spot_subs.py) get a SNAPSHOT of the band followed by
+# DELTAs as spots come & go.  Their records also say what happened to the
+# spot & carry the mode, since a station can be spotted on more than one mode:
+#
+#    op       B    ADD_OP, UPDATE_OP or DELETE_OP
+#    call     12s  Null padded
+#    freq     Q    Hz
+#    band     H
+#    color    B    Index into COLORS
+#    mode     8s   Null padded
+#
+# All of the records in a SNAPSHOT are ADD_OPs.  Each spot is identified by
+# (call,band,mode).  An ADD or UPDATE of a spot the client already has (or
+# doesn't have) just replaces it & a DELETE of a spot it doesn't have is
+# ignored so nothing is lost if a change shows up in both a snapshot & the
+# delta after it.  The seq of a SNAPSHOT is that of the last DELTA sent for
+# the band - each DELTA after it is one more.  If a client sees a gap, it
+# should ask for a new snapshot.
+#
+# Once a client has subscribed, anything else we send it (e.g. the reply to a
+# Stats query) comes as a TEXT message whose payload is exactly what would
+# have been sent otherwise.  The band & seq of a TEXT message are 0.
+#
+# All values are big endian.  The length lets a reader on a stream socket
+# find where one message ends & the next one starts.
+#
+################################################################################
+
+import struct
+import zlib
+
+################################################################################
+
+MAGIC       = b'BM'
+VERSION     = 2                   # 2 - freqs are 64 bits
+
+# Message types
+SPOT_LIST   = 1
+SNAPSHOT    = 2
+DELTA       = 3
+TEXT        = 4
+
+# What happened to a spot
+ADD_OP      = 1
+UPDATE_OP   = 2
+DELETE_OP   = 3
+
+# Flags
+COMPRESSED  = 1
+
+COMPRESS_OVER = 1000              # Only bother compressing payloads bigger than this
+
+HEADER = struct.Struct('!2sBBBxHII')
+RECORD = struct.Struct('!12sQHBx')
+DELTA_RECORD = struct.Struct('!B12sQHB8s')
+
+# Colors are sent as a small int - new colors go on the end so old clients
+# don't get confused
+COLORS = [None,'yellow','lightgreen','red','coral','magenta','violet','pink',
+          'lightskyblue','turquoise','deepskyblue','gold','orange','white']
+COLOR_CODES = dict( [(c,i) for i,c in enumerate(COLORS)] )
+
+################################################################################
+
+# Function to pack one spot
+def pack_spot(x):
+    call  = x.dx_call.encode('ascii','replace')[:12]
+    freq  = int( round(1000.*float(x.frequency)) )
+    color = COLOR_CODES.get(x.color,0)
+    return RECORD.pack(call,freq,int(x.band),color)
+
+# Function to unpack one spot - returns a dict
+def unpack_spot(data,offset=0):
+    call,freq,band,color = RECORD.unpack_from(data,offset)
+    if color<len(COLORS):
+        color = COLORS[color]
+    else:
+        color = None
+    return {'call'  : call.rstrip(b'\0').decode('ascii','replace'),
+            'freq'  : 1e-3*freq,              # kHz, same as the spots
+            'band'  : band,
+            'color' : color}
+
+# Function to pack one spot with what happened to it
+def pack_delta(op,x):
+    call  = x.dx_call.encode('ascii','replace')[:12]
+    freq  = int( round(1000.*float(x.frequency)) )
+    color = COLOR_CODES.get(x.color,0)
+    mode  = (x.mode or '').encode('ascii','replace')[:8]
+    return DELTA_RECORD.pack(op,call,freq,int(x.band),color,mode)
+
+# Function to unpack one spot with what happened to it - returns a dict
+def unpack_delta(data,offset=0):
+    op,call,freq,band,color,mode = DELTA_RECORD.unpack_from(data,offset)
+    if color<len(COLORS):
+        color = COLORS[color]
+    else:
+        color = None
+    return {'op'    : op,
+            'call'  : call.rstrip(b'\0').decode('ascii','replace'),
+            'freq'  : 1e-3*freq,
+            'band'  : band,
+            'color' : color,
+            'mode'  : mode.rstrip(b'\0').decode('ascii','replace')}
+
+# Function to put together a message
+def pack_message(msg_type,band,payload,seq=0):
+    flags = 0
+    if len(payload)>COMPRESS_OVER:
+        payload = zlib.compress(payload)
+        flags |= COMPRESSED
+    return HEADER.pack(MAGIC,VERSION,flags,msg_type,band,seq,len(payload)) + payload
+
+# Function to put together a spot list message
+def pack_spot_list(band,spots,seq=0):
+    payload = b''.join( [pack_spot(x) for x in spots] )
+    return pack_message(SPOT_LIST,band,payload,seq)
+
+# Function to put together a snapshot for a subscriber
+def pack_snapshot(band,spots,seq):
+    payload = b''.join( [pack_delta(ADD_OP,x) for x in spots] )
+    return pack_message(SNAPSHOT,band,payload,seq)
+
+################################################################################
+
+# Function to pull the header off the front of a message.
+# Returns a dict or None if there isn't a whole header yet.
+# Raises ValueError if this isn't one of our messages.
+def unpack_header(data):
+    if len(data)<HEADER.size:
+        return None
+    magic,version,flags,msg_type,band,seq,length = HEADER.unpack_from(data)
+    if magic!=MAGIC:
+        raise ValueError('Not a bandmap message')
+    if version!=VERSION:
+        raise ValueError('Unknown bandmap message version %d' % version)
+    return {'version' : version,
+            'flags'   : flags,
+            'type'    : msg_type,
+            'band'    : band,
+            'seq'     : seq,
+            'length'  : length}
+
+# Function to pull one message off the front of a buffer.
+# Returns (header,payload,rest) or (None,None,data) if the whole message
+# hasn't arrived yet.  The payload is uncompressed if need be.
+def read_message(data):
+    hdr = unpack_header(data)
+    if hdr==None or len(data)<HEADER.size+hdr['length']:
+        return None,None,data
+    end     = HEADER.size+hdr['length']
+    payload = data[HEADER.size:end]
+    if hdr['flags'] & COMPRESSED:
+        payload = zlib.decompress(payload)
+    return hdr,payload,data[end:]
+
+# Function to unpack the spots in a spot list payload
+def unpack_spot_list(payload):
+    return [unpack_spot(payload,i) for i in range(0,len(payload)-RECORD.size+1,RECORD.size)]
+
+# Function to unpack the spots in a snapshot or delta payload
+def unpack_deltas(payload):
+    return [unpack_delta(payload,i) for i in range(0,len(payload)-DELTA_RECORD.size+1,DELTA_RECORD.size)]
@@ -0,0 +1,118 @@
+################################################################################
+#
+# spot_queue.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Changes to the spot list that are passed from the cluster feed to the gui.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import queue
+import threading
+from collections import OrderedDict
+from latency import LATENCY,stamp
+
+################################################################################
+
+# The feed thread tells the gui what happened to a spot, not which row of the
+# list box to change.  By the time the gui gets around to it, other spots may
+# have been inserted or deleted so row numbers aren't reliable.
+ADD    = 'add'                # New spot to display
+UPDATE = 'update'             # Spot info, freq and/or color changed
+DELETE = 'delete'             # Spot should no longer be displayed
+
+################################################################################
+
+# Queue used to pass changes from the feed thread to the gui.
+# Rather than have the gui poll the queue, we poke it (e.g. with a Tk virtual
+# event) when something shows up.  Only one poke is outstanding at a time -
+# the gui calls drained() before it empties the queue which re-arms things.
+# Tk hands a poke from another thread to the gui thread & waits for it so
+# never put anything in here while holding a lock the gui might wait on
+# (e.g. ClusterFeed.lock).
+class SpotQueue(queue.Queue):
+    def __init__(self,maxsize=0):
+        queue.Queue.__init__(self,maxsize)
+        self.waker   = None
+        self.pending = threading.Event()
+        self.origins = []             # When the spots we've handed out came off the socket
+
+    # Install function to call when there is something in the queue
+    def set_waker(self,waker):
+        self.waker = waker
+
+    def put(self,item,block=True,timeout=None):
+        queue.Queue.put(self,item,block,timeout)
+        self.poke()
+
+    # Let the gui know it has something to do
+    def poke(self):
+        if self.waker and not self.pending.is_set():
+            self.pending.set()
+            try:
+                self.waker()
+            except:
+                # Gui may be going away - it'll catch up on its next tick
+                self.pending.clear()
+
+    # Gui is about to empty the queue so the next put needs to wake it up again
+    def drained(self):
+        self.pending.clear()
+
+    # Gui has put everything it took out of the queue on the screen
+    def painted(self):
+        with self.mutex:
+            origins = self.origins
+            self.origins = []
+        t = stamp()
+        for t0 in origins:
+            LATENCY.add('total',t-t0)
+
+    # Each entry is stamped on the way in so we can tell how long it sat here.
+    # These are called by Queue with its lock held.
+    def _put(self,item):
+        self.queue.append( (stamp(),LATENCY.origin(),item) )
+
+    def _get(self):
+        t,origin,item = self.queue.popleft()
+        LATENCY.add('queue',stamp()-t)
+        if origin is not None:
+            self.origins.append(origin)
+        return item
+
+################################################################################
+
+# Function to merge a batch of changes so each spot is touched at most once.
+# Returns a list of [op,spot] in the order the spots were first seen.
+def coalesce(entries):
+    ops = OrderedDict()
+    for op,x in entries:
+        key  = id(x)
+        prev = ops.get(key)
+        if prev is None:
+            ops[key] = [op,x]
+        elif prev[0]==ADD:
+            if op==DELETE:
+                # Came and went before we got to show it
+                del ops[key]
+        elif prev[0]==UPDATE:
+            if op==DELETE:
+                prev[0] = DELETE
+        elif prev[0]==DELETE:
+            if op!=DELETE:
+                # Deleted and put back - just refresh it
+                prev[0] = UPDATE
+    return list( ops.values() )
+
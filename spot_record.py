@@ -0,0 +1,183 @@
+################################################################################
+#
+# spot_record.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Compact version of a spot for keeping in the spot list.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import sys
+import threading
+from datetime import datetime
+import pytz
+from station_cache import STATIONS
+from spot_filter import mode_class,stateside
+
+################################################################################
+
+UTC = pytz.utc
+
+# Bits in SpotRecord.flags
+NEEDED         = 1
+NEED_THIS_YEAR = 2
+NEED_MODE      = 4
+NEW_MULT       = 8
+STATESIDE      = 16           # U.S. station (other than 1x1s, etc.)
+
+################################################################################
+
+# There are only a handful of bands, modes & colors so each spot just keeps
+# a small int & looks up the actual value in one of these.  New values are
+# added as they show up.
+class Codebook:
+    def __init__(self,values=[]):
+        self.lock   = threading.Lock()
+        self.values = []
+        self.codes  = {}
+        for val in values:
+            self.code(val)
+
+    # Return code for a value
+    def code(self,val):
+        c = self.codes.get(val)
+        if c is None:
+            with self.lock:
+                c = self.codes.get(val)
+                if c is None:
+                    c = len(self.values)
+                    self.values.append(val)
+                    self.codes[val] = c
+        return c
+
+    # Return value for a code
+    def value(self,c):
+        return self.values[c]
+
+BANDS  = Codebook([160,80,60,40,30,20,17,15,12,10,6,2])
+MODES  = Codebook(['CW','SSB','LSB','USB','FM','FT8','FT4','DIGITAL','JT65','PSK','RTTY'])
+COLORS = Codebook([None,'red','coral','magenta','violet','pink','lightskyblue',
+                   'turquoise','deepskyblue','yellow','lightgreen','white'])
+
+################################################################################
+
+# Fixed-layout spot.  The parsed Spot object carries along its own Station,
+# the raw line and a bunch of other stuff we never look at again so once a
+# spot has been digested, we keep just what's needed to display, color &
+# age it.  Station info (lat/lon, zones, etc.) isn't copied - it comes from
+# the station cache when needed.  Properties keep the same attribute names
+# as Spot so the rest of the code doesn't care which one it's dealing with.
+class SpotRecord:
+    __slots__ = ('dx_call','country','continent','frequency','band_code',
+                 'mode_code','mode_class','epoch','color_code','flags','cwops',
+                 'snr','wpm','df','cnt','row_key','row')
+
+    def __init__(self,dx_call,country,frequency,band,mode,time,color=None,
+                 snr='',wpm='',df=0,cnt=1,continent=None):
+        self.dx_call    = sys.intern(dx_call)
+        self.country    = sys.intern(country) if country else country
+        self.continent  = sys.intern(continent) if continent else continent
+        self.frequency  = float(frequency)
+        self.band_code  = BANDS.code(band)
+        self.mode       = mode
+        self.time       = time
+        self.color_code = COLORS.code(color)
+        self.flags      = 0
+        self.cwops      = 0           # 0=Not a member, 1=Not worked yet, 2=Worked
+        self.stateside  = stateside(self.dx_call,self.country)
+        self.snr        = snr
+        self.wpm        = wpm
+        self.df         = df
+        self.cnt        = cnt
+        self.row_key    = None
+        self.row        = None
+
+    # Function to create a record from a digested Spot
+    @classmethod
+    def from_spot(cls,obj):
+        x = cls(obj.dx_call,obj.dx_station.country,obj.frequency,obj.band,obj.mode,
+                obj.time,getattr(obj,'color',None),
+                getattr(obj,'snr',''),getattr(obj,'wpm',''),getattr(obj,'df',0),
+                getattr(obj,'cnt',1),obj.dx_station.continent)
+        x.cwops          = getattr(obj,'cwops',0)
+        x.needed         = getattr(obj,'needed',False)
+        x.need_this_year = getattr(obj,'need_this_year',False)
+        x.need_mode      = getattr(obj,'need_mode',False)
+        x.new_mult       = getattr(obj,'new_mult',False)
+        return x
+
+    def __repr__(self):
+        return 'SpotRecord(%s,%.1f,%s,%s)' % (self.dx_call,self.frequency,self.band,self.mode)
+
+    # Spot time is kept as seconds since the epoch
+    @property
+    def time(self):
+        return datetime.fromtimestamp(self.epoch,UTC)
+    @time.setter
+    def time(self,t):
+        if isinstance(t,datetime):
+            if t.tzinfo==None:
+                t=t.replace(tzinfo=UTC)
+            self.epoch = t.timestamp()
+        else:
+            self.epoch = float(t)
+
+    @property
+    def band(self):
+        return BANDS.value(self.band_code)
+    @band.setter
+    def band(self,b):
+        self.band_code = BANDS.code(b)
+
+    @property
+    def mode(self):
+        return MODES.value(self.mode_code)
+    @mode.setter
+    def mode(self,m):
+        self.mode_code  = MODES.code(m)
+        self.mode_class = mode_class(m)
+
+    @property
+    def color(self):
+        return COLORS.value(self.color_code)
+    @color.setter
+    def color(self,c):
+        self.color_code = COLORS.code(c)
+
+    # Station info comes from the shared cache
+    @property
+    def dx_station(self):
+        return STATIONS.get(self.dx_call)
+
+    # Flags
+    def _get_flag(self,bit):
+        return (self.flags & bit)!=0
+    def _set_flag(self,bit,val):
+        if val:
+            self.flags |= bit
+        else:
+            self.flags &= ~bit
+
+    needed         = property(lambda self: self._get_flag(NEEDED),
+                              lambda self,val: self._set_flag(NEEDED,val))
+    need_this_year = property(lambda self: self._get_flag(NEED_THIS_YEAR),
+                              lambda self,val: self._set_flag(NEED_THIS_YEAR,val))
+    need_mode      = property(lambda self: self._get_flag(NEED_MODE),
+                              lambda self,val: self._set_flag(NEED_MODE,val))
+    new_mult       = property(lambda self: self._get_flag(NEW_MULT),
+                              lambda self,val: self._set_flag(NEW_MULT,val))
+    stateside      = property(lambda self: self._get_flag(STATESIDE),
+                              lambda self,val: self._set_flag(STATESIDE,val))
+
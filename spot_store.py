@@ -0,0 +1,417 @@
+################################################################################
+#
+# spot_store.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Hash-indexed container for the spots collected by bandmap.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import threading
+import heapq
+from bisect import bisect_left,bisect_right
+from spot_queue import ADD,UPDATE,DELETE
+
+################################################################################
+
+MAX_AGE   = 5                 # Default lifetime of spots seen more than once (minutes)
+SHORT_AGE = 3                 # Lifetime of spots only seen once (minutes)
+FRESH_AGE = 2                 # Spots are colored as new for this long (minutes)
+
+################################################################################
+
+# Object to hold all of the spots we know about.
+# The spots are indexed by (call,band,mode) - this is what makes a spot unique -
+# and also by (call,band), by call and by band so the common lookups don't
+# need to scan the entire list.  All of the indices are kept in sync by
+# insert, update & remove so use these rather than fiddling with the dicts.
+# Each spot's expiry time is also kept in a min-heap so culling old spots
+# only looks at the spots that are actually due.  When a spot is refreshed,
+# a new entry is pushed & the old one is ignored when it comes off the heap.
+# A second heap does the same for when each spot is no longer new so its
+# color can be updated (see aged()).
+# A listener can be installed to hear about every change (e.g. to send them
+# on to subscribers) - it gets (op,spot) with the lock held so it needs to be
+# quick.  Clearing the store is (None,None).
+class SpotStore:
+    def __init__(self):
+        self.lock      = threading.RLock()    # Feed, gui & udp threads all get in here
+        self.max_age   = MAX_AGE
+        self.short_age = SHORT_AGE
+        self.listener  = None
+        self.clear()
+
+    # Install function to call when a spot changes
+    def set_listener(self,listener):
+        self.listener = listener
+
+    # Remove all spots
+    def clear(self):
+        with self.lock:
+            self.by_key       = {}        # (call,band,mode) -> spot
+            self.by_call_band = {}        # (call,band)      -> [spots]
+            self.by_call      = {}        # call             -> [spots]
+            self.by_band      = {}        # band             -> {(call,band,mode) : spot}
+            self.heap         = []        # [(expiry,seq,spot)]
+            self.expiry       = {}        # id(spot)         -> current expiry time
+            self.age_heap     = []        # [(no longer new,seq,spot)]
+            self.fresh        = {}        # id(spot)         -> when its no longer new
+            self.red          = {}        # id(spot)         -> spot for dupes
+            self.seq          = 0         # Tie breaker for heap entries
+            if self.listener:
+                self.listener(None,None)
+
+    # Key used to identify a unique spot
+    def key(self,x):
+        return (x.dx_call,x.band,x.mode)
+
+    def __len__(self):
+        return len(self.by_key)
+
+    # Iterate over a snapshot so other threads can keep adding/removing spots
+    def __iter__(self):
+        with self.lock:
+            spots = list( self.by_key.values() )
+        return iter(spots)
+
+    # Look up a spot by call, band & mode
+    def find(self,call,band,mode):
+        return self.by_key.get( (call,band,mode) )
+
+    # Return all spots for a call on a given band (any mode)
+    def find_call_band(self,call,band):
+        with self.lock:
+            return list( self.by_call_band.get( (call,band) , [] ) )
+
+    # Return all spots for a call on any band
+    def find_call(self,call):
+        with self.lock:
+            return list( self.by_call.get(call, []) )
+
+    # Return all spots on a particular band
+    def band_spots(self,band):
+        with self.lock:
+            return list( self.by_band.get(band, {}).values() )
+
+    # Add a new spot
+    def insert(self,x):
+        with self.lock:
+            key = self.key(x)
+            old = self.by_key.get(key)
+            if old is not None:
+                self.remove(old)
+            self.by_key[key] = x
+            self.by_call_band.setdefault( (x.dx_call,x.band) , [] ).append(x)
+            self.by_call.setdefault( x.dx_call , [] ).append(x)
+            self.by_band.setdefault( x.band , {} )[key] = x
+            self._schedule(x)
+            if self.listener:
+                self.listener(ADD,x)
+
+    # Refresh an existing spot with info from a new spot of the same station
+    def update(self,x,obj):
+        with self.lock:
+            x.time      = obj.time
+            x.frequency = float(obj.frequency)
+            x.snr       = obj.snr
+            x.wpm       = obj.wpm
+            x.color     = obj.color
+            if hasattr(obj,'df'):
+                x.df    = obj.df
+            x.cnt      += 1
+            self._schedule(x)
+            if self.listener:
+                self.listener(UPDATE,x)
+        return x
+
+    # Change the color of a spot
+    def recolor(self,x,c):
+        with self.lock:
+            x.color = c
+            self._schedule(x)
+            if self.listener:
+                self.listener(UPDATE,x)
+
+    # Remove a spot
+    def remove(self,x):
+        with self.lock:
+            key = self.key(x)
+            if self.by_key.get(key) is not x:
+                return False
+            del self.by_key[key]
+            self._unlink(self.by_call_band, (x.dx_call,x.band) , x)
+            self._unlink(self.by_call, x.dx_call , x)
+            band = self.by_band.get(x.band)
+            if band is not None:
+                band.pop(key,None)
+                if len(band)==0:
+                    del self.by_band[x.band]
+            self.expiry.pop(id(x),None)
+            self.fresh.pop(id(x),None)
+            self.red.pop(id(x),None)
+            if self.listener:
+                self.listener(DELETE,x)
+            return True
+
+    # Set lifetime of spots - spots seen more than once last max_age minutes,
+    # one-offs only short_age minutes
+    def set_ages(self,max_age,short_age=SHORT_AGE):
+        with self.lock:
+            if max_age==self.max_age and short_age==self.short_age:
+                return
+            self.max_age   = max_age
+            self.short_age = short_age
+            self._rebuild()
+
+    # Return list of spots that have expired.  Dupes are also expired unless
+    # we're showing them.
+    def expired(self,now,show_dupes=True):
+        spots=[]
+        with self.lock:
+            heap=self.heap
+            while len(heap)>0 and heap[0][0]<=now:
+                t,seq,x = heapq.heappop(heap)
+                if self.expiry.get(id(x))==t and self.by_key.get(self.key(x)) is x:
+                    spots.append(x)
+            if not show_dupes:
+                due = set([id(x) for x in spots])
+                for k,x in self.red.items():
+                    if k not in due:
+                        spots.append(x)
+
+            # Don't let stale entries pile up if spots are refreshed a lot
+            if len(heap) > 4*len(self.expiry)+1000:
+                self._rebuild()
+        return spots
+
+    # Return list of spots that are no longer new - their colors need to be
+    # re-computed since the color of a spot can depend on its age
+    def aged(self,now):
+        spots=[]
+        with self.lock:
+            heap=self.age_heap
+            while len(heap)>0 and heap[0][0]<=now:
+                t,seq,x = heapq.heappop(heap)
+                if self.fresh.get(id(x))==t and self.by_key.get(self.key(x)) is x:
+                    spots.append(x)
+            if len(heap) > 4*len(self.fresh)+1000:
+                self._rebuild()
+        return spots
+
+    # Work out when a spot expires & put it on the heap
+    def _schedule(self,x):
+        epoch = getattr(x,'epoch',None)
+        if epoch is None:
+            epoch = x.time.timestamp()
+        if x.cnt>=2:
+            t = epoch + 60*self.max_age
+        else:
+            t = epoch + 60*self.short_age
+        if self.expiry.get(id(x))!=t:
+            self.expiry[id(x)] = t
+            heapq.heappush(self.heap,(t,self.seq,x))
+            self.seq+=1
+        t = epoch + 60*FRESH_AGE
+        if self.fresh.get(id(x))!=t:
+            self.fresh[id(x)] = t
+            heapq.heappush(self.age_heap,(t,self.seq,x))
+            self.seq+=1
+        if x.color=='red':
+            self.red[id(x)] = x
+        else:
+            self.red.pop(id(x),None)
+
+    # Re-build the heap from scratch
+    def _rebuild(self):
+        self.heap     = []
+        self.expiry   = {}
+        self.age_heap = []
+        self.fresh    = {}
+        for x in self.by_key.values():
+            self._schedule(x)
+
+    # Remove all spots for a particular call
+    def remove_call(self,call):
+        with self.lock:
+            spots = list( self.by_call.get(call, []) )
+            for x in spots:
+                self.remove(x)
+        return spots
+
+    # Helper to remove an entry from one of the list-valued indices
+    def _unlink(self,index,key,x):
+        lst = index.get(key)
+        if lst is None:
+            return
+        for i,y in enumerate(lst):
+            if y is x:
+                del lst[i]
+                break
+        if len(lst)==0:
+            del index[key]
+
+################################################################################
+
+# List of spots kept sorted by frequency.  A parallel list of frequencies
+# allows bisection so finding the insertion point, the spot nearest the rig
+# freq or all of the spots in a freq range doesn't require a full scan.
+# The freq of each spot is remembered when it is inserted since a dupe spot
+# can change the freq of an existing spot - call move() when that happens.
+class SortedSpots:
+    def __init__(self,spots=[]):
+        self.spots   = []
+        self.freqs   = []
+        self.freq_of = {}                 # id(spot) -> freq used to place it
+        for x in sorted(spots, key=lambda x: float(x.frequency)):
+            f=float(x.frequency)
+            self.spots.append(x)
+            self.freqs.append(f)
+            self.freq_of[id(x)] = f
+
+    def __len__(self):
+        return len(self.spots)
+
+    def __iter__(self):
+        return iter(list(self.spots))
+
+    def __getitem__(self,i):
+        return self.spots[i]
+
+    def __delitem__(self,i):
+        x=self.spots.pop(i)
+        del self.freqs[i]
+        self.freq_of.pop(id(x),None)
+
+    def __contains__(self,x):
+        return id(x) in self.freq_of
+
+    # Insert a spot & return its position in the list
+    # New spots go after any existing spots with the same freq
+    def insert(self,x):
+        f=float(x.frequency)
+        i=bisect_right(self.freqs,f)
+        self.spots.insert(i,x)
+        self.freqs.insert(i,f)
+        self.freq_of[id(x)] = f
+        return i
+
+    # Return position of a spot in the list or -1 if its not there
+    def index(self,x):
+        f=self.freq_of.get(id(x))
+        if f is None:
+            return -1
+        i=bisect_left(self.freqs,f)
+        while i<len(self.spots) and self.freqs[i]==f:
+            if self.spots[i] is x:
+                return i
+            i+=1
+        return -1
+
+    # Remove a spot & return the position it had
+    def remove(self,x):
+        i=self.index(x)
+        if i>=0:
+            del self[i]
+        return i
+
+    # Re-position a spot after its freq has changed
+    # Returns the old and new positions
+    def move(self,x):
+        i=self.remove(x)
+        if i<0:
+            return -1,-1
+        return i,self.insert(x)
+
+    # Return position of spot closest to a freq or -1 if list is empty
+    def nearest(self,frq):
+        n=len(self.freqs)
+        if n==0:
+            return -1
+        i=bisect_left(self.freqs,frq)
+        if i==0:
+            return 0
+        elif i==n:
+            return n-1
+        elif frq-self.freqs[i-1] <= self.freqs[i]-frq:
+            return i-1
+        else:
+            return i
+
+    # Return list of spots with f1 <= freq <= f2
+    def between(self,f1,f2):
+        i1=bisect_left(self.freqs,f1)
+        i2=bisect_right(self.freqs,f2)
+        return self.spots[i1:i2]
+
+    # Look for a gap of at least min_df between adjacent spots above (UP) or
+    # below the given freq.  Returns the middle of the gap or None.
+    def find_gap(self,frq,UP,min_df):
+        if UP:
+            i1=bisect_right(self.freqs,frq)
+            freqs=self.freqs[i1:]
+        else:
+            i2=bisect_left(self.freqs,frq)
+            freqs=self.freqs[:i2][::-1]
+        for flast,f in zip(freqs[:-1],freqs[1:]):
+            if abs(f-flast)>min_df:
+                return 0.5*(f+flast)
+        return None
+
+################################################################################
+
+# Sorted list of spots for every band.  The feed keeps all of these up to date
+# as spots come in so switching bands is just a matter of picking a different
+# view - P.current is always one of these.
+class BandViews:
+    def __init__(self):
+        self.views = {}                   # band -> SortedSpots
+
+    # Return the view for a band, creating it if need be
+    def view(self,band):
+        v = self.views.get(band)
+        if v is None:
+            v = SortedSpots()
+            self.views[band] = v
+        return v
+
+    # Replace the view for a band - used when the filters change
+    def set_view(self,band,spots):
+        v = self.view(band)
+        v.__init__(spots)
+        return v
+
+    def clear(self):
+        for v in self.views.values():
+            v.__init__()
+
+    def __contains__(self,x):
+        v = self.views.get(x.band)
+        return v is not None and x in v
+
+    def insert(self,x):
+        return self.view(x.band).insert(x)
+
+    def remove(self,x):
+        v = self.views.get(x.band)
+        if v is None:
+            return -1
+        return v.remove(x)
+
+    def move(self,x):
+        v = self.views.get(x.band)
+        if v is None:
+            return -1,-1
+        return v.move(x)
+
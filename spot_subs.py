@@ -0,0 +1,222 @@
+################################################################################
+#
+# spot_subs.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Keep other apps (keyer, sdr, etc.) up to date with the spots on a band
+# without them having to keep asking for the whole list.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import select
+import socket
+import threading
+from spot_queue import ADD,UPDATE,DELETE
+from spot_filter import SpotFilter
+from spot_proto import pack_delta,pack_snapshot,pack_message,DELTA,TEXT, \
+    ADD_OP,UPDATE_OP,DELETE_OP
+from utilities import error_trap
+from bm_log import get_log
+
+################################################################################
+
+SUB_TICK = 0.25               # How often changes are sent out (sec)
+SEND_TIMEOUT = 1.0            # Subscribers that can't keep up are dropped after this (sec)
+SEND_CHUNK   = 4096           # Max bytes handed to the socket at a time
+
+OPS = {ADD:ADD_OP, UPDATE:UPDATE_OP, DELETE:DELETE_OP}
+
+UDP_LOG = get_log('udp')
+
+################################################################################
+
+# Object to keep track of who wants to hear about which bands.
+# A new subscriber gets a snapshot of the band.  After that, the spot store
+# tells us about every change (see SpotStore.set_listener) & every SUB_TICK
+# the changes for each band are bundled into one message with the next
+# sequence no. & sent to everyone subscribed to that band.  If nothing
+# changes, nothing is sent.  See spot_proto.py for the message format.
+# Once a client has subscribed, everything else we send it (e.g. replies to
+# its other queries) is wrapped up as a TEXT message so it can tell them apart.
+#
+# Locking - the spot store calls notify() with its lock held so we always
+# take the store lock before our own, never the other way around.  Messages
+# are put together with the locks held but sent after they're released so a
+# subscriber that's stalled can't hold up the feed.  The send lock keeps the
+# messages going out in order (e.g. a snapshot before the deltas after it) -
+# its taken before the other two & notify() never needs it.  Each socket also
+# has its own lock so a reply from the message handler & a message from here
+# can't get mixed up on the way out.
+class Subscriptions:
+    def __init__(self,P,tick=SUB_TICK):
+        self.P       = P
+        self.tick    = tick
+        self.lock    = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.sock_locks = {}          # socket -> lock
+        self.subs    = {}             # band -> [sockets]
+        self.seq     = {}             # band -> seq of last delta sent
+        self.pending = {}             # band -> [packed changes]
+        self.resync  = False          # Everyone needs a new snapshot
+        self.filter  = SpotFilter(P,show_dupes=True)
+
+        self.Stopper = threading.Event()
+        self.sender  = threading.Thread(target=self.Sender, name='Spot Subscriptions')
+        self.sender.daemon=True
+        self.sender.start()
+
+    # Called by the spot store whenever a spot changes - needs to be quick
+    def notify(self,op,x):
+        if len(self.subs)==0:
+            return
+        if op==None:
+            # Store was cleared
+            self.resync = True
+            return
+        band = x.band
+        if band not in self.subs:
+            return
+
+        # Spots that don't pass the filter aren't sent.  If a spot stops
+        # passing (e.g. we just found out its a new CWops member), its removed.
+        if op!=DELETE and not self.filter(x):
+            if op==ADD:
+                return
+            op=DELETE
+        rec = pack_delta(OPS[op],x)
+        with self.lock:
+            self.pending.setdefault(band,[]).append(rec)
+
+    # Settings changed - everyone gets a fresh snapshot
+    def refilter(self):
+        self.filter = SpotFilter(self.P,show_dupes=True)
+        self.resync = True
+
+    # Function to send a reply from the message handler.  If the client has
+    # subscribed, the reply is wrapped up as a TEXT message (unless its
+    # already one of ours) & sent the same way as the changes.
+    def reply(self,sock,data,framed=False):
+        with self.lock:
+            lock = self.sock_locks.get(sock)
+        if not lock:
+            sock.send(data)
+            return
+        if not framed:
+            data = pack_message(TEXT,0,data)
+        with lock:
+            self._sendall(sock,data)
+
+    # Function to send a message w/o waiting forever.  The socket belongs to
+    # the tcp server so we leave its settings alone & wait for room ourselves.
+    def _sendall(self,sock,data):
+        data = memoryview(data)
+        while len(data)>0:
+            _,ready,_ = select.select([],[sock],[],SEND_TIMEOUT)
+            if not ready:
+                raise socket.timeout('Subscriber not keeping up')
+            n = sock.send(data[:SEND_CHUNK])
+            data = data[n:]
+
+    # Function to send messages - call with the send lock held but not the others.
+    # A subscriber that's gone away or can't keep up is dropped.
+    def _send(self,msgs):
+        dropped=[]
+        for sock,msg in msgs:
+            if sock in dropped:
+                continue
+            with self.lock:
+                lock = self.sock_locks.get(sock)
+            if not lock:
+                continue                 # Unsubscribed in the mean time
+            try:
+                with lock:
+                    self._sendall(sock,msg)
+            except:
+                error_trap('SPOT SUBS: Problem sending to subscriber - dropping it')
+                self.unsubscribe(sock)
+                dropped.append(sock)
+
+    # Function to put together a snapshot of a band - call with both locks held
+    def _snapshot(self,sock,band):
+        spots = self.filter.filter( self.P.SpotList.band_spots(band) )
+        msg   = pack_snapshot(band,spots,self.seq.get(band,0))
+        UDP_LOG.info('SPOT SUBS: Sending snapshot of %sm - %d spots in %d bytes',band,len(spots),len(msg))
+        return (sock,msg)
+
+    # Add a subscriber to a band & send it what we have so far
+    def subscribe(self,sock,band):
+        with self.send_lock:
+            with self.P.SpotList.lock:
+                with self.lock:
+                    socks = self.subs.setdefault(band,[])
+                    if sock not in socks:
+                        socks.append(sock)
+                    self.sock_locks.setdefault(sock,threading.Lock())
+                    msgs = [self._snapshot(sock,band)]
+            self._send(msgs)
+
+    # Remove a subscriber from a band or, if no band is given, from all bands
+    def unsubscribe(self,sock,band=None):
+        with self.lock:
+            for b in list(self.subs.keys()):
+                if (band==None or b==band) and sock in self.subs[b]:
+                    self.subs[b].remove(sock)
+                if len(self.subs[b])==0:
+                    del self.subs[b]
+                    self.pending.pop(b,None)
+            if not any([sock in socks for socks in self.subs.values()]):
+                self.sock_locks.pop(sock,None)
+
+    # Send a subscriber new snapshots of all its bands - e.g. after it missed something
+    def refresh(self,sock):
+        with self.send_lock:
+            with self.P.SpotList.lock:
+                with self.lock:
+                    msgs = [self._snapshot(sock,band) for band,socks in self.subs.items()
+                            if sock in socks]
+            self._send(msgs)
+
+    # Thread to send out the changes
+    def Sender(self):
+        while not self.Stopper.wait(self.tick):
+            try:
+                with self.send_lock:
+                    msgs=[]
+                    if self.resync:
+                        self.resync = False
+                        with self.P.SpotList.lock:
+                            with self.lock:
+                                self.pending = {}
+                                for band,socks in self.subs.items():
+                                    for sock in socks:
+                                        msgs.append( self._snapshot(sock,band) )
+
+                    else:
+                        with self.lock:
+                            pending = self.pending
+                            self.pending = {}
+                            for band,recs in pending.items():
+                                socks = self.subs.get(band)
+                                if not socks:
+                                    continue
+                                seq = self.seq.get(band,0)+1
+                                self.seq[band] = seq
+                                msg = pack_message(DELTA,band,b''.join(recs),seq)
+                                for sock in socks:
+                                    msgs.append( (sock,msg) )
+
+                    self._send(msgs)
+            except:
+                error_trap('SPOT SUBS->SENDER: Problem sending changes ???')
@@ -0,0 +1,110 @@
+################################################################################
+#
+# station_cache.py - Rev 1.0
+# Copyright (C) 2021-5 by Joseph B. Attili, joe DOT aa2il AT gmail DOT com
+#
+# Cache of resolved call signs so we don't keep looking up the same
+# prefixes in the cty data.
+#
+################################################################################
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+################################################################################
+
+import threading
+from collections import OrderedDict
+from dx import load_cty_info
+import dx.spot_processing as spot_processing
+from dx.spot_processing import Station
+
+################################################################################
+
+MAX_STATIONS = 5000
+
+################################################################################
+
+# LRU cache of Station objects keyed by call sign.
+# The same few hundred calls get spotted over & over so there is no need
+# to resolve each one against the cty data every time we see it.
+class StationCache:
+    def __init__(self,maxsize=MAX_STATIONS):
+        self.maxsize  = maxsize
+        self.lock     = threading.Lock()
+        self.stations = OrderedDict()
+        self.hits     = 0
+        self.misses   = 0
+
+    def __len__(self):
+        return len(self.stations)
+
+    # Return station info for a call, resolving it if we haven't seen it lately
+    def get(self,call):
+        with self.lock:
+            station = self.stations.get(call)
+            if station is not None:
+                self.hits+=1
+                self.stations.move_to_end(call)
+                return station
+            self.misses+=1
+
+        # Resolve outside the lock - this is the slow part
+        station = Station(call)
+        return self.share(call,station)
+
+    # Add a station that was already resolved elsewhere.
+    # Returns the cached copy if there is one so all spots of a call share it.
+    def share(self,call,station):
+        with self.lock:
+            old = self.stations.get(call)
+            if old is not None:
+                self.stations.move_to_end(call)
+                return old
+            elif station is None:
+                return None
+            self.stations[call] = station
+            if len(self.stations)>self.maxsize:
+                self.stations.popitem(last=False)
+            return station
+
+    # Flush the cache - needed whenever the cty data changes
+    def invalidate(self):
+        with self.lock:
+            self.stations.clear()
+
+    # Return hit/miss counters
+    def stats(self):
+        ntot = self.hits + self.misses
+        if ntot>0:
+            rate = 100.*self.hits/ntot
+        else:
+            rate = 0.
+        return {'size'   : len(self.stations),
+                'hits'   : self.hits,
+                'misses' : self.misses,
+                'hit rate' : rate}
+
+################################################################################
+
+# The cache shared by everyone
+STATIONS = StationCache()
+
+# Spot() resolves the dx & spotter calls with whatever Station is in its
+# module when it's called, so pointing that at the cache is all it takes for
+# every spot to skip the cty lookup for calls we've seen lately.  The cache
+# itself still uses the real Station for the ones it hasn't.
+spot_processing.Station = STATIONS.get
+
+# Function to (re-)load the cty data - anything resolved with the old data is stale
+def load_cty(DIR=None):
+    load_cty_info(DIR=DIR)
+    STATIONS.invalidate()
+
@@ -27,11 +27,15 @@ import psutil
 import time
 from datetime import datetime
 import pytz
+from station_cache import STATIONS
+from feed_state import STREAMING,IDLE
+from latency import LATENCY
 
 ################################################################################
 
 VERBOSITY=0
 UTC = pytz.utc
+LATENCY_LOG_SEC=60              # How often to log spot latency
 
 ################################################################################
 
@@ -41,6 +45,8 @@ class WatchDog:
 
         self.P = P
         self.dt =.001*msec
+        self.last_latency = time.time()
+        self.last_status  = None
         P.SHUTDOWN = False
 
         # Kick off watchdog monito
@@ -52,7 +58,7 @@ class WatchDog:
     def Monitor(self):
         P=self.P
         now = datetime.utcnow().replace(tzinfo=UTC)
-        t1 = datetime.strptime(now.strftime("%Y%m%d %H%M%S"), "%Y%m%d %H%M%S") 
+        t1 = now.replace(microsecond=0,tzinfo=None)
         print('WATCHDOG - t=',t1,flush=True)
     
         # Check if another thread shut down - this isn't complete yet
@@ -67,8 +73,22 @@ class WatchDog:
         # Monitor memory usage
         if P.MEM:
             P.MEM.take_snapshot()
+            if P.LATENCY_LOG and time.time()-self.last_latency>=LATENCY_LOG_SEC:
+                LATENCY.log(P.LATENCY_LOG)
+                self.last_latency = time.time()
+        if P.DEBUG>0:
+            print('\tWATCHDOG: Station cache=',STATIONS.stats())
+            for node,stats in P.ClusterFeed.dedup.stats().items():
+                print('\tWATCHDOG: Node',node,'%(lines)d lines, %(rate).1f/min, %(dupes)d dupes (%(dupe pct).1f%%)' % stats)
 
-        # Check on telnet cluster connection
+        # Check on telnet cluster connection - only say something if it changed
+        state  = P.ClusterFeed.state
+        status = (P.SERVER,state.state,state.reconnects)
+        if P.DEBUG>0 or status!=self.last_status:
+            print('\tWATCHDOG: Cluster',P.SERVER,'-',state.status())
+            self.last_status = status
+        if P.ClusterFeed.state.state not in [STREAMING,IDLE]:
+            P.ClusterFeed.gui_status('Cluster '+P.SERVER+': '+P.ClusterFeed.state.status())
         if not P.ClusterFeed.tn:
             print('\tWATCHDOG: Whooops - no cluster feed!!!!!!!!!!!!!!!!!!')
             INTERNET,host_name,host_ip = check_internet()